@@ -8,6 +8,7 @@ import { StudentManager } from './components/StudentManager';
 import { ApplicationManager } from './components/ApplicationManager';
 import { UserManager } from './components/UserManager';
 import { Login } from './components/Login';
+import { waitForJob } from './services/jobs';
 import {
   User,
   University,
@@ -71,6 +72,7 @@ export default function App() {
   };
 
   const handleLogout = () => {
+    fetch('/api/logout', { method: 'POST' }).catch(() => {});
     localStorage.removeItem('userSession');
     setState(prev => ({ ...prev, currentUser: null }));
   };
@@ -95,7 +97,7 @@ export default function App() {
       });
       const data = await res.json();
       if (res.ok) {
-        setState(prev => ({ ...prev, universities: [...prev.universities, { ...uni, id: data.id }] }));
+        setState(prev => ({ ...prev, universities: [...prev.universities, { ...uni, id: data.id, logo: data.logo || undefined }] }));
       } else {
         alert(data.message || t.errorAdd);
       }
@@ -115,7 +117,7 @@ export default function App() {
       if (res.ok) {
         setState(prev => ({
           ...prev,
-          universities: prev.universities.map(u => u.id === uni.id ? uni : u)
+          universities: prev.universities.map(u => u.id === uni.id ? { ...uni, logo: data.logo || undefined, logoThumb: undefined } : u)
         }));
       } else {
         alert(data.message || t.errorUpdate);
@@ -130,11 +132,16 @@ export default function App() {
       const res = await fetch(`/api/universities/${id}`, { method: 'DELETE' });
       const data = await res.json();
       if (res.ok) {
-        setState(prev => ({
-          ...prev,
-          universities: prev.universities.filter(u => u.id !== id),
-          programs: prev.programs.filter(p => p.universityId !== id)
-        }));
+        // Programs and their applications are deleted with the university
+        setState(prev => {
+          const removed = new Set(prev.programs.filter(p => p.universityId === id).map(p => p.id));
+          return {
+            ...prev,
+            universities: prev.universities.filter(u => u.id !== id),
+            programs: prev.programs.filter(p => p.universityId !== id),
+            applications: prev.applications.filter(a => !removed.has(a.programId))
+          };
+        });
       } else {
         alert(data.message || t.errorDelete);
       }
@@ -148,7 +155,11 @@ export default function App() {
       const res = await fetch(`/api/programs/${id}`, { method: 'DELETE' });
       const data = await res.json();
       if (res.ok) {
-        setState(prev => ({ ...prev, programs: prev.programs.filter(p => p.id !== id) }));
+        setState(prev => ({
+          ...prev,
+          programs: prev.programs.filter(p => p.id !== id),
+          applications: prev.applications.filter(a => a.programId !== id)
+        }));
       } else {
         alert(data.message || t.errorDelete);
       }
@@ -220,6 +231,29 @@ export default function App() {
     return null;
   };
 
+  const importStudents = async (file: File) => {
+    const form = new FormData();
+    form.append('file', file);
+    if (state.currentUser) {
+      form.append('role', state.currentUser.role);
+      form.append('user_id', state.currentUser.id);
+    }
+    const res = await fetch('/api/students/import?async=1', { method: 'POST', body: form });
+    let data = await res.json();
+    if (res.status === 202) {
+      const job = await waitForJob(data.jobId);
+      if (job.status === 'failed') return { ok: false, message: job.error || undefined };
+      data = job.result;
+    }
+    if (res.ok && data.imported > 0) {
+      let url = `/api/students?role=${state.currentUser?.role}`;
+      if (state.currentUser?.role === UserRole.AGENT) url += `&user_id=${state.currentUser.id}`;
+      const students = await fetch(url).then(r => r.json());
+      setState(prev => ({ ...prev, students }));
+    }
+    return { ok: res.ok, ...data };
+  };
+
   const addApplication = async (app: Application, files?: FileList | null) => {
     const formData = new FormData();
     formData.append('studentId', app.studentId);
@@ -310,30 +344,19 @@ export default function App() {
     if (!state.currentUser) return;
     const fetchAll = async () => {
       try {
-        // إعداد روابط الطلبات حسب نوع المستخدم
-        let studentsUrl = '/api/students';
-        let applicationsUrl = '/api/applications';
+        // كل البيانات اللازمة للدور الحالي في طلب واحد مضغوط
+        let bootstrapUrl = `/api/bootstrap?role=${state.currentUser.role}`;
         if (state.currentUser.role === UserRole.AGENT) {
-          studentsUrl += `?role=agent&user_id=${state.currentUser.id}`;
-          applicationsUrl += `?role=agent&user_id=${state.currentUser.id}`;
-        }
-        const endpoints = [
-          '/api/universities',
-          '/api/programs',
-          studentsUrl,
-          applicationsUrl
-        ];
-        if (state.currentUser.role === UserRole.ADMIN) {
-          endpoints.push('/api/users');
+          bootstrapUrl += `&user_id=${state.currentUser.id}`;
         }
-        const responses = await Promise.all(endpoints.map(e => fetch(e).then(r => r.json())));
+        const data = await fetch(bootstrapUrl).then(r => r.json());
         setState(prev => ({
           ...prev,
-          universities: responses[0],
-          programs: responses[1],
-          students: responses[2],
-          applications: responses[3],
-          users: state.currentUser?.role === UserRole.ADMIN ? responses[4] : []
+          universities: data.universities || [],
+          programs: data.programs || [],
+          students: data.students || [],
+          applications: data.applications || [],
+          users: state.currentUser?.role === UserRole.ADMIN ? (data.users || []) : []
         }));
       } catch (err) {
         console.error('Error fetching data:', err);
@@ -359,6 +382,7 @@ export default function App() {
             applications={state.applications}
             programs={state.programs}
             universitiesCount={state.universities.length}
+            currentUser={state.currentUser}
           />
         );
       case 'universities':
@@ -366,7 +390,7 @@ export default function App() {
       case 'programs':
         return <ProgramManager programs={state.programs} universities={state.universities} onAddProgram={addProgram} onEditProgram={editProgram} onDeleteProgram={deleteProgram} currentUser={state.currentUser} />;
       case 'students':
-        return <StudentManager students={state.students} applications={state.applications} programs={state.programs} universities={state.universities} onAddStudent={addStudent} onCreateApplicationForStudent={openCreateApplicationForStudent} onViewApplication={openApplicationDetails} currentUser={state.currentUser} />;
+        return <StudentManager students={state.students} applications={state.applications} programs={state.programs} universities={state.universities} onAddStudent={addStudent} onImportStudents={importStudents} onCreateApplicationForStudent={openCreateApplicationForStudent} onViewApplication={openApplicationDetails} currentUser={state.currentUser} />;
       case 'applications':
         return <ApplicationManager applications={state.applications} students={state.students} programs={state.programs} universities={state.universities} onAddApplication={addApplication} onUpdateStatus={updateAppStatus} initialStudentId={prefillStudentIdForApp} clearInitialStudent={() => setPrefillStudentIdForApp(null)} targetApplicationId={targetApplicationId} clearTargetApplication={() => setTargetApplicationId(null)} currentUser={state.currentUser} />;
       case 'account':
@@ -378,6 +402,7 @@ export default function App() {
             applications={state.applications}
             programs={state.programs}
             universitiesCount={state.universities.length}
+            currentUser={state.currentUser}
           />
         );
     }
@@ -0,0 +1,139 @@
+"""Session tokens, password hashing and the per-process principal cache.
+
+``login`` hands out a token signed with the app's SECRET_KEY that carries
+only the user id. The token is sent back as an HttpOnly cookie (which also
+covers EventSource and <img> requests) or as ``Authorization: Bearer``.
+Verifying it needs no database access; the caller's role and name come from
+a small LRU cache with a TTL, so only the first request of a user after a
+miss or expiry loads the row. Routes that change or delete a user drop its
+entry; other worker processes pick the change up within ``PRINCIPAL_TTL``.
+"""
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, request
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from models import db, User
+
+TOKEN_COOKIE = 'session_token'
+TOKEN_SALT = 'session'
+TOKEN_MAX_AGE = int(os.getenv('SESSION_MAX_AGE', 24 * 3600))
+# Any werkzeug method string, e.g. scrypt:32768:8:1 or pbkdf2:sha256:600000.
+# Raising the cost upgrades stored hashes on each user's next login.
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', 1024))
+PRINCIPAL_TTL = float(os.getenv('PRINCIPAL_TTL', 60))
+
+Principal = namedtuple('Principal', ['id', 'role', 'name'])
+
+_MISSING = object()
+
+
+class PrincipalCache:
+    """Bounded LRU of user id -> Principal (or None for unknown ids)."""
+
+    def __init__(self, maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_TTL, clock=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock or time.monotonic
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires, value = entry
+            if expires <= self._clock():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principals = PrincipalCache()
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def _hash_method(stored):
+    parts = stored.split('$')
+    if len(parts) == 3 and parts[0].startswith(('scrypt', 'pbkdf2')):
+        return parts[0]
+    return None
+
+
+def check_password(stored, password):
+    """Return (matches, needs_rehash) for a stored password.
+
+    Rows created before hashing keep the plain password; they still match
+    and report needs_rehash so login can replace them.
+    """
+    if not stored or password is None:
+        return False, False
+    method = _hash_method(stored)
+    if method is None:
+        matches = hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+        return matches, matches
+    if not check_password_hash(stored, password):
+        return False, False
+    return True, method != PASSWORD_HASH_METHOD
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt=TOKEN_SALT)
+
+
+def issue_token(user):
+    principals.put(user.id, Principal(user.id, user.role, user.name))
+    return _serializer().dumps({'uid': user.id})
+
+
+def _request_token():
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return request.cookies.get(TOKEN_COOKIE)
+
+
+def principal_from_request():
+    """The Principal behind the request's token, or None when absent/invalid."""
+    token = _request_token()
+    if not token:
+        return None
+    try:
+        data = _serializer().loads(token, max_age=TOKEN_MAX_AGE)
+    except BadSignature:
+        return None
+    user_id = data.get('uid') if isinstance(data, dict) else None
+    if not user_id:
+        return None
+    principal = principals.get(user_id)
+    if principal is _MISSING:
+        row = db.session.query(User.id, User.role, User.name).filter_by(id=user_id).first()
+        principal = Principal(row.id, row.role, row.name) if row else None
+        principals.put(user_id, principal)
+    return principal
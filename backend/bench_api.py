@@ -0,0 +1,223 @@
+"""Scripted load test for the API with a latency/SQL report and baseline check.
+
+Requests go through Flask's test client, so the numbers cover routing,
+serialization and the database but not the network or a WSGI server. Each
+workload is a route with realistic parameters; the report gives per-workload
+p50/p95/p99 latency, throughput and the average number of SQL statements.
+
+Runs against the benchmark database of bench_data.py (BENCH_DATABASE_URL or
+--embedded DIR), seeding it first with --seed:
+
+    python bench_api.py --embedded /tmp/benchpg --seed --students 20000 --notifications 200000
+    python bench_api.py --embedded /tmp/benchpg --save-baseline bench_baseline.json
+    python bench_api.py --embedded /tmp/benchpg --baseline bench_baseline.json
+
+With --baseline the exit status is 1 when a workload's p95 grew by more
+than --tolerance (and by more than --min-delta-ms) or it issues more SQL
+statements than before, so the run can gate CI.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_data import (BENCH_PASSWORD, agent_count, bench_database_url, seed,
+                        add_scale_arguments, scale_from_args)
+
+_counter = threading.local()
+
+
+def _count_statement(*args):
+    _counter.statements = getattr(_counter, 'statements', 0) + 1
+
+
+def _percentile(sorted_values, pct):
+    # Nearest-rank percentile of an already sorted list
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Context:
+    """Tokens and ids the workloads draw their parameters from."""
+
+    def __init__(self, client, scale, rnd):
+        self.rnd = rnd
+        self.scale = scale
+        self.agents = agent_count(scale['students'])
+        self.admin = self._login(client, 'admin0@bench.local')
+        self.agent_tokens = [self._login(client, f'agent{i}@bench.local')
+                             for i in range(min(self.agents, 20))]
+
+    @staticmethod
+    def _login(client, email):
+        response = client.post('/api/login', json={'email': email, 'password': BENCH_PASSWORD})
+        if response.status_code != 200:
+            raise SystemExit(f'login failed for {email}; seed the database with --seed')
+        return {'Authorization': 'Bearer ' + response.json['token']}
+
+    def agent(self):
+        return self.rnd.choice(self.agent_tokens)
+
+    def application_id(self):
+        return f"APP{self.rnd.randint(1, self.scale['applications']):06d}"
+
+    def since(self):
+        return f"2025-12-{self.rnd.randint(1, 28):02d}T00:00:00"
+
+
+# name -> function(ctx) returning (method, path, headers, json body)
+WORKLOADS = {
+    'login': lambda c: ('POST', '/api/login', {},
+                        {'email': f'agent{c.rnd.randrange(c.agents)}@bench.local', 'password': BENCH_PASSWORD}),
+    'universities': lambda c: ('GET', '/api/universities', c.admin, None),
+    'programs': lambda c: ('GET', '/api/programs', c.admin, None),
+    'students.admin.page': lambda c: ('GET', '/api/students?limit=50', c.admin, None),
+    'students.agent': lambda c: ('GET', '/api/students', c.agent(), None),
+    'applications.admin.page': lambda c: ('GET', '/api/applications?limit=50', c.admin, None),
+    'applications.agent.page': lambda c: ('GET', '/api/applications?limit=50', c.agent(), None),
+    'applications.filtered': lambda c: ('GET', '/api/applications?limit=50&status=Accepted&semester=Fall',
+                                        c.admin, None),
+    'messages.latest': lambda c: ('GET', f'/api/applications/{c.application_id()}/messages?limit=50',
+                                  c.admin, None),
+    'messages.post': lambda c: ('POST', f'/api/applications/{c.application_id()}/messages', c.agent(),
+                                {'sender': 'agent', 'message': 'benchmark message'}),
+    'status.update': lambda c: ('PUT', f'/api/applications/{c.application_id()}/status', c.admin,
+                                {'status': c.rnd.choice(['Accepted', 'Rejected', 'Under Review'])}),
+    'notifications.since': lambda c: ('GET', f'/api/notifications?since={c.since()}', c.agent(), None),
+    'notifications.unread': lambda c: ('GET', '/api/notifications/unread-count', c.agent(), None),
+    'search': lambda c: ('GET', f"/api/search?q={c.rnd.choice(['ahm', 'omar', 'student12', 'istan', 'medic'])}",
+                         c.admin, None),
+    'stats.admin': lambda c: ('GET', '/api/stats', c.admin, None),
+    'stats.agent': lambda c: ('GET', '/api/stats', c.agent(), None),
+    'bootstrap.agent': lambda c: ('GET', '/api/bootstrap', c.agent(), None),
+}
+
+
+def run_workload(app, ctx, name, requests, warmup, concurrency):
+    build = WORKLOADS[name]
+    clients = threading.local()
+    lock = threading.Lock()
+
+    def one(_):
+        client = getattr(clients, 'client', None)
+        if client is None:
+            client = clients.client = app.test_client()
+        with lock:
+            method, path, headers, body = build(ctx)
+        _counter.statements = 0
+        start = time.perf_counter()
+        response = client.open(path, method=method, headers=headers, json=body)
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name}: {method} {path} -> {response.status_code} {response.get_data(as_text=True)[:200]}')
+        return elapsed, _counter.statements
+
+    for i in range(warmup):
+        one(i)
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(one, range(requests)))
+    else:
+        samples = [one(i) for i in range(requests)]
+    wall = time.perf_counter() - start
+
+    latencies = sorted(s[0] * 1000 for s in samples)
+    return {
+        'requests': requests,
+        'p50': _percentile(latencies, 50),
+        'p95': _percentile(latencies, 95),
+        'p99': _percentile(latencies, 99),
+        'mean': statistics.fmean(latencies),
+        'throughput': requests / wall,
+        'queries': statistics.fmean(s[1] for s in samples),
+    }
+
+
+def print_report(results):
+    print(f"{'workload':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['p50']:9.2f}{r['p95']:9.2f}{r['p99']:9.2f}{r['throughput']:9.1f}{r['queries']:9.2f}")
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return a list of human-readable regressions against baseline."""
+    regressions = []
+    for name, base in baseline.get('results', {}).items():
+        current = results.get(name)
+        if current is None:
+            continue
+        limit = base['p95'] * (1 + tolerance)
+        if current['p95'] > limit and current['p95'] - base['p95'] > min_delta_ms:
+            regressions.append(f"{name}: p95 {current['p95']:.2f} ms > {base['p95']:.2f} ms + {tolerance:.0%}")
+        if current['queries'] > base['queries'] + 0.01:
+            regressions.append(f"{name}: {current['queries']:.2f} SQL statements per request, was {base['queries']:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_scale_arguments(parser)
+    parser.add_argument('--seed', action='store_true', help='wipe and seed the benchmark database first')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per workload')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads per workload')
+    parser.add_argument('--only', help='comma-separated workload names')
+    parser.add_argument('--random-seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--save-baseline', metavar='PATH', help='store the results as the new baseline')
+    parser.add_argument('--baseline', metavar='PATH', help='fail on regressions against this baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative p95 growth')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='ignore p95 growth below this')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = bench_database_url(args.embedded)
+    from sqlalchemy import event
+    from app import create_app, db
+
+    app = create_app()
+    scale = scale_from_args(args)
+    names = args.only.split(',') if args.only else list(WORKLOADS)
+    unknown = [n for n in names if n not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(unknown)}")
+
+    with app.app_context():
+        if args.seed:
+            seed(db.engine, scale)
+        event.listen(db.engine, 'before_cursor_execute', _count_statement)
+        ctx = Context(app.test_client(), scale, random.Random(args.random_seed))
+        results = {}
+        for name in names:
+            results[name] = run_workload(app, ctx, name, args.requests, args.warmup, args.concurrency)
+
+    print_report(results)
+    document = {
+        'scale': scale,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'results': results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as fh:
+            json.dump(document, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        if baseline.get('scale') != scale:
+            print('warning: baseline was recorded at a different scale', file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print('REGRESSION', line)
+        if regressions:
+            sys.exit(1)
+        print('no regressions against', args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Synthetic data for benchmarks and load tests.
+
+Seeds users, universities, programs, students, applications, messages and
+notifications with set-based INSERT ... SELECT over generate_series, so a
+million rows take seconds instead of minutes of ORM inserts. Values are
+derived from the row number only, so every run produces the same data.
+
+The target database is wiped first. It is taken from BENCH_DATABASE_URL, or
+with --embedded a throwaway PostgreSQL is started through the optional
+``pgserver`` package; the regular DATABASE_URL is never used.
+
+    BENCH_DATABASE_URL=postgresql://postgres:pw@localhost/studentdb_bench \\
+        python bench_data.py --students 100000 --notifications 1000000
+"""
+import argparse
+import os
+import time
+
+from sqlalchemy import text
+
+BENCH_PASSWORD = 'bench'
+DEFAULT_SCALE = {
+    'students': 100000,
+    'applications': 150000,
+    'messages': 500000,
+    'notifications': 1000000,
+    'universities': 200,
+    'programs': 2000,
+}
+ADMINS = 3
+STAFF = 5
+NATIONALITIES = ['SY', 'EG', 'IQ', 'JO', 'TR', 'YE', 'LY', 'SD']
+STATUSES = ['Under Review', 'Accepted', 'Rejected', 'Missing Documents']
+
+
+def agent_count(students):
+    return max(10, students // 500)
+
+
+def bench_database_url(embedded_dir=None):
+    """URL of the benchmark database; starts pgserver when embedded_dir is set."""
+    if embedded_dir:
+        try:
+            import pgserver
+        except ImportError:
+            raise SystemExit('--embedded needs the pgserver package (pip install pgserver)')
+        uri = pgserver.get_server(embedded_dir).get_uri()
+        return uri.replace('postgresql://', 'postgresql+psycopg2://', 1)
+    url = os.getenv('BENCH_DATABASE_URL')
+    if not url:
+        raise SystemExit('Set BENCH_DATABASE_URL to a scratch database or pass --embedded DIR')
+    return url
+
+
+def _sql_list(values):
+    return 'ARRAY[' + ', '.join(f"'{v}'" for v in values) + ']'
+
+
+def seed(engine, scale, log=print):
+    """Wipe the database behind engine and fill it according to scale."""
+    from app import db
+    from auth import hash_password
+    from migrations import upgrade
+
+    students = scale['students']
+    agents = agent_count(students)
+    nat = _sql_list(NATIONALITIES)
+    status = _sql_list(STATUSES)
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public"))
+    upgrade(engine, log=lambda message: None)
+
+    # (label, statement); :agents, :students, ... are bound from params
+    steps = [
+        ('users', f"""
+            INSERT INTO users (id, name, email, password, role, phone, country_code)
+            SELECT 'bench-' || r || '-' || g, initcap(r) || ' ' || g, r || g || '@bench.local', :password,
+                   CASE r WHEN 'admin' THEN 'ADMIN' WHEN 'staff' THEN 'USER' ELSE 'agent' END,
+                   '5' || lpad(g::text, 8, '0'), '+90'
+            FROM (SELECT 'admin' AS r, generate_series(0, {ADMINS - 1}) AS g
+                  UNION ALL SELECT 'staff', generate_series(0, {STAFF - 1})
+                  UNION ALL SELECT 'agent', generate_series(0, :agents - 1)) s"""),
+        ('universities', """
+            INSERT INTO universities (id, name, website, country, city, description)
+            SELECT 'U' || g, 'University ' || g, 'https://u' || g || '.example.edu',
+                   (ARRAY['Turkey', 'Malaysia', 'Cyprus', 'Germany'])[1 + g % 4],
+                   (ARRAY['Istanbul', 'Ankara', 'Kuala Lumpur', 'Nicosia', 'Berlin'])[1 + g % 5],
+                   'Synthetic university ' || g
+            FROM generate_series(0, :universities - 1) g"""),
+        ('programs', """
+            INSERT INTO programs (id, university_id, name, degree, language, years, deadline, fee, currency, description)
+            SELECT 'P' || g, 'U' || (g % :universities),
+                   (ARRAY['Computer Engineering', 'Medicine', 'Business', 'Architecture', 'Law'])[1 + g % 5] || ' ' || g,
+                   (ARRAY['Bachelor', 'Master', 'PhD'])[1 + g % 3], (ARRAY['English', 'Turkish'])[1 + g % 2],
+                   2 + g % 4, '2026-08-31', 1000 + (g % 50) * 250, 'USD', ''
+            FROM generate_series(0, :programs - 1) g"""),
+        ('students', f"""
+            INSERT INTO students (id, first_name, last_name, passport_number, father_name, mother_name, gender,
+                                  phone, email, nationality, degree_target, dob, residence_country, user_id)
+            SELECT 'S' || lpad(g::text, 7, '0'),
+                   (ARRAY['Ahmad', 'Mohammed', 'Omar', 'Sara', 'Lina', 'Yusuf', 'Maryam', 'Ali'])[1 + g % 8],
+                   'Student' || g, 'BP' || lpad(g::text, 8, '0'), 'Father' || g % 97, 'Mother' || g % 89,
+                   CASE WHEN g % 2 = 0 THEN 'Male' ELSE 'Female' END, '5' || lpad(g::text, 9, '0'),
+                   's' || g || '@bench.local', ({nat})[1 + g % {len(NATIONALITIES)}],
+                   (ARRAY['Bachelor', 'Master', 'PhD'])[1 + g % 3], '2000-01-01', 'Turkey',
+                   'bench-agent-' || (g % :agents)
+            FROM generate_series(0, :students - 1) g"""),
+        ('applications', f"""
+            INSERT INTO applications (id, student_id, program_id, status, semester, created_at, files, user_id)
+            SELECT 'APP' || lpad(g::text, 6, '0'), 'S' || lpad((g % :students)::text, 7, '0'),
+                   'P' || (g * 7 % :programs), ({status})[1 + g % {len(STATUSES)}],
+                   (ARRAY['Fall', 'Spring'])[1 + g % 2],
+                   timestamp '2024-01-01' + (g::double precision / :applications) * interval '730 days',
+                   ARRAY[]::varchar[], 'bench-agent-' || (g % :students % :agents)
+            FROM generate_series(1, :applications) g"""),
+        ('application_messages', """
+            INSERT INTO application_messages (id, application_id, sender, message, created_at)
+            SELECT 'M' || g, 'APP' || lpad((1 + g % :applications)::text, 6, '0'),
+                   CASE WHEN g % 3 = 0 THEN 'ADMIN' ELSE 'agent' END, 'Synthetic message ' || g,
+                   timestamp '2024-01-01' + (g::double precision / :messages) * interval '730 days'
+            FROM generate_series(0, :messages - 1) g"""),
+        ('notifications', f"""
+            INSERT INTO notifications (id, user_id, title, message, link, is_read, created_at, type)
+            SELECT 'N' || g,
+                   CASE WHEN g % 10 >= 3 THEN 'bench-agent-' || (g % :agents)
+                        WHEN g % 2 = 0 THEN 'bench-admin-' || (g / 2 % {ADMINS})
+                        ELSE 'bench-staff-' || (g / 2 % {STAFF}) END,
+                   'Application Status Update', 'Synthetic notification ' || g,
+                   '/applications/APP' || lpad((1 + g % :applications)::text, 6, '0'),
+                   g % 5 <> 0,
+                   timestamp '2024-01-01' + (g::double precision / :notifications) * interval '730 days',
+                   CASE WHEN g % 2 = 0 THEN 'STATUS' ELSE 'MESSAGE' END
+            FROM generate_series(0, :notifications - 1) g"""),
+    ]
+    params = dict(scale, agents=agents, password=hash_password(BENCH_PASSWORD))
+    for label, statement in steps:
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            used = {k: v for k, v in params.items() if f':{k}' in statement}
+            rows = conn.execute(text(statement), used).rowcount
+        log(f'{label:>22}: {rows:>9} rows in {time.perf_counter() - start:6.1f} s')
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            conn.execute(text(f"ANALYZE {table.name}"))
+
+
+def add_scale_arguments(parser):
+    for name, default in DEFAULT_SCALE.items():
+        parser.add_argument(f'--{name}', type=int, default=default)
+    parser.add_argument('--embedded', metavar='DIR',
+                        help='run against a throwaway PostgreSQL in DIR (needs pgserver)')
+
+
+def scale_from_args(args):
+    return {name: getattr(args, name) for name in DEFAULT_SCALE}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+    os.environ['DATABASE_URL'] = bench_database_url(args.embedded)
+    from app import create_app, db
+    app = create_app()
+    with app.app_context():
+        seed(db.engine, scale_from_args(args))
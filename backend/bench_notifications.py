@@ -0,0 +1,64 @@
+"""Benchmark message notification fan-out at 1k and 10k staff recipients.
+
+Compares the old per-recipient ORM loop with the single INSERT ... SELECT
+used by post_application_message. Everything runs inside a transaction that
+is rolled back, so it is safe to point at a development database:
+
+    python bench_notifications.py
+"""
+import time
+import uuid
+from datetime import datetime
+
+from app import create_app, db
+from models import User, Notification
+from routes import _notify_staff
+
+
+def _seed_staff(count):
+    db.session.execute(User.__table__.insert(), [{
+        'id': f'bench-{uuid.uuid4()}',
+        'name': 'bench',
+        'email': f'bench-{uuid.uuid4()}@example.com',
+        'password': 'x',
+        'role': 'USER'
+    } for _ in range(count)])
+    db.session.flush()
+
+
+def _orm_loop():
+    for user in User.query.filter(User.role.in_(['ADMIN', 'USER'])).all():
+        db.session.add(Notification(
+            id=str(uuid.uuid4()),
+            user_id=user.id,
+            title='New Message',
+            message='App #BENCH: hello...',
+            link='/applications/BENCH',
+            created_at=datetime.utcnow(),
+            type='MESSAGE'
+        ))
+    db.session.flush()
+
+
+def _bulk():
+    _notify_staff(None, 'New Message', 'App #BENCH: hello...', '/applications/BENCH', 'MESSAGE')
+    db.session.flush()
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        for count in (1000, 10000):
+            try:
+                _seed_staff(count)
+                loop = _timed(_orm_loop)
+                bulk = _timed(_bulk)
+                print(f'{count:>6} recipients: ORM loop {loop * 1000:8.1f} ms | INSERT ... SELECT {bulk * 1000:8.1f} ms')
+            finally:
+                db.session.rollback()
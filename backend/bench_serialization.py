@@ -0,0 +1,68 @@
+"""Rows per second of the list endpoints, end to end through the test client.
+
+Covers query, row materialisation, dict building and JSON encoding of the
+students and applications listings (full list and a 500-row page), with and
+without a ?fields= projection. Runs against the benchmark database of
+bench_data.py:
+
+    python bench_serialization.py --embedded /tmp/benchpg --seed --students 100000
+    python bench_serialization.py --embedded /tmp/benchpg --repeat 5
+"""
+import argparse
+import os
+import statistics
+import time
+
+from bench_data import BENCH_PASSWORD, bench_database_url, seed, add_scale_arguments, scale_from_args
+
+CASES = [
+    ('students', '/api/students'),
+    ('students page', '/api/students?limit=500'),
+    ('students fields', '/api/students?fields=id,firstName,lastName,passportNumber'),
+    ('applications', '/api/applications'),
+    ('applications page', '/api/applications?limit=500'),
+    ('applications fields', '/api/applications?fields=id,studentId,status,createdAt'),
+]
+
+
+def measure(client, headers, path, repeat):
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise SystemExit(f'{path} -> {response.status_code}')
+        body = response.get_json()
+        rows = len(body['items'] if isinstance(body, dict) else body)
+    best = min(timings)
+    return rows, best, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_scale_arguments(parser)
+    parser.add_argument('--seed', action='store_true', help='wipe and seed the benchmark database first')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = bench_database_url(args.embedded)
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        if args.seed:
+            seed(db.engine, scale_from_args(args))
+        client = app.test_client()
+        login = client.post('/api/login', json={'email': 'admin0@bench.local', 'password': BENCH_PASSWORD})
+        headers = {'Authorization': 'Bearer ' + login.json['token']}
+        print(f"{'case':<22}{'rows':>9}{'best ms':>10}{'median ms':>11}{'rows/s':>11}")
+        for name, path in CASES:
+            client.get(path, headers=headers)  # warm up
+            rows, best, median = measure(client, headers, path, args.repeat)
+            print(f"{name:<22}{rows:>9}{best * 1000:>10.1f}{median * 1000:>11.1f}{rows / median:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
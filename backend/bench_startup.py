@@ -0,0 +1,62 @@
+"""Benchmark backend cold start, as paid by every worker restart.
+
+Each run starts a fresh interpreter that imports the app, builds it and
+checks the schema, and reports the time of each phase. The schema check is
+measured both with the versioned runner (migrations.upgrade on a current
+database) and with the old boot sequence (create_all plus column
+inspection), so point it at a database that is already migrated:
+
+    python migrate.py
+    python bench_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 7
+
+
+def _child(mode):
+    t0 = time.perf_counter()
+    from app import create_app, db
+    import routes  # noqa: F401
+    t1 = time.perf_counter()
+    app = create_app()
+    t2 = time.perf_counter()
+    with app.app_context():
+        if mode == 'versioned':
+            from migrations import upgrade
+            upgrade(db.engine, log=lambda message: None)
+        else:
+            from sqlalchemy import inspect
+            db.create_all()
+            inspector = inspect(db.engine)
+            inspector.get_columns('users')
+            inspector.get_columns('universities')
+    t3 = time.perf_counter()
+    print(json.dumps({'import': t1 - t0, 'create_app': t2 - t1, 'schema': t3 - t2}))
+
+
+def _run(mode):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, __file__, '--child', mode], check=True,
+                         capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    phases = json.loads(out.strip().splitlines()[-1])
+    phases['total'] = time.perf_counter() - start
+    return phases
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        _child(sys.argv[2])
+        sys.exit(0)
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    for mode in ('versioned', 'legacy'):
+        samples = [_run(mode) for _ in range(runs)]
+        line = ' | '.join(f"{phase} {statistics.median(s[phase] for s in samples) * 1000:7.1f} ms"
+                          for phase in ('import', 'create_app', 'schema', 'total'))
+        print(f'{mode:>9}: {line}  (median of {runs})')
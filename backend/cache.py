@@ -0,0 +1,64 @@
+"""Precomputed JSON bodies with strong ETags for rarely-changing catalogs.
+
+Each cached catalog has a version file under ``<instance>/cache``. Writers
+bump it by appending one byte after they commit, so every worker process sees
+the change on its next ``os.stat`` and rebuilds its copy; readers never touch
+the database while their copy is current. Clients that send a matching
+``If-None-Match`` get an empty 304.
+"""
+import hashlib
+import os
+import threading
+
+from flask import current_app, request, Response
+
+_lock = threading.Lock()
+_bodies = {}
+
+
+def _version_path(name):
+    folder = os.path.join(current_app.instance_path, 'cache')
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{name}.version")
+
+
+def current_version(name):
+    try:
+        st = os.stat(_version_path(name))
+    except FileNotFoundError:
+        return '0'
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def invalidate(*names):
+    """Mark catalogs as changed for every worker. Call after commit."""
+    for name in names:
+        fd = os.open(_version_path(name), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, b'.')
+        finally:
+            os.close(fd)
+
+
+def cached_json(name, build):
+    """Serve build() as JSON from the per-process cache, honouring If-None-Match."""
+    # Read the version before building so a concurrent write can only make
+    # the cached body look older than it is, never newer.
+    version = current_version(name)
+    with _lock:
+        entry = _bodies.get(name)
+    if entry is None or entry[0] != version:
+        body = current_app.json.dumps_bytes(build())
+        etag = hashlib.sha256(body).hexdigest()
+        entry = (version, body, etag)
+        with _lock:
+            _bodies[name] = entry
+    _, body, etag = entry
+
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
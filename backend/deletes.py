@@ -0,0 +1,70 @@
+"""Set-based deletes of universities, programs and users.
+
+Each function takes a list of ids and issues a fixed number of statements
+however many ids (and dependent rows) there are, inside the caller's
+transaction. Applications under deleted programs are removed explicitly
+with ``DELETE ... RETURNING files`` so the references to their uploads can
+be released in one batch; messages then go with their applications through
+``ON DELETE CASCADE``. Users are deleted with a single statement: their
+notifications cascade and the students, applications and jobs they owned
+keep existing with ``user_id`` set to NULL (see the foreign keys in
+models.py and migration 9).
+
+The caller commits, then calls ``remove_logos`` for the returned logos and
+``storage.remove_uploads`` for the returned upload entries.
+"""
+from sqlalchemy import text
+
+from storage import release_uploads
+
+
+def _delete_applications(session, condition, params):
+    files = session.execute(text(
+        f"DELETE FROM applications WHERE {condition} RETURNING files"
+    ), params).scalars().all()
+    released = release_uploads(session, [entry for entries in files if entries for entry in entries])
+    return len(files), released
+
+
+def delete_programs(session, ids):
+    """Delete programs and their applications.
+
+    Returns (deleted ids, applications deleted, released upload entries).
+    """
+    params = {'ids': list(ids)}
+    applications, released = _delete_applications(session, "program_id = ANY(:ids)", params)
+    deleted = session.execute(text(
+        "DELETE FROM programs WHERE id = ANY(:ids) RETURNING id"
+    ), params).scalars().all()
+    return deleted, applications, released
+
+
+def delete_universities(session, ids):
+    """Delete universities with their programs and applications.
+
+    Returns (deleted ids, programs deleted, applications deleted, logos no
+    longer used by any university, released upload entries).
+    """
+    params = {'ids': list(ids)}
+    applications, released = _delete_applications(
+        session, "program_id IN (SELECT id FROM programs WHERE university_id = ANY(:ids))", params)
+    programs = session.execute(text(
+        "DELETE FROM programs WHERE university_id = ANY(:ids)"
+    ), params).rowcount
+    rows = session.execute(text(
+        "DELETE FROM universities WHERE id = ANY(:ids) RETURNING id, logo"
+    ), params).all()
+    logos = {logo for _, logo in rows if logo}
+    if logos:
+        # Logos are stored once per content and may be shared
+        logos -= set(session.execute(text(
+            "SELECT DISTINCT logo FROM universities WHERE logo = ANY(:logos)"
+        ), {'logos': list(logos)}).scalars())
+    return [uni_id for uni_id, _ in rows], programs, applications, logos, released
+
+
+def delete_users(session, ids):
+    """Delete users; returns the deleted ids."""
+    return session.execute(text(
+        "DELETE FROM users WHERE id = ANY(:ids) RETURNING id"
+    ), {'ids': list(ids)}).scalars().all()
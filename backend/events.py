@@ -0,0 +1,140 @@
+"""In-process wake-ups for notification streams.
+
+Routes call ``notification_hub.publish`` after committing new notifications.
+Open ``/api/notifications/stream`` connections block on the hub and only
+touch the database when their user's version has moved, so idle clients cost
+nothing on the database side. The hub is per worker process; a stream that
+misses a wake-up from another worker still picks the rows up through its
+``since`` cursor on the next event or reconnect. With several worker
+processes, ``PgRelay`` forwards every publish to the other workers through
+PostgreSQL LISTEN/NOTIFY.
+"""
+import json
+import os
+import select
+import threading
+import time
+
+from sqlalchemy import text
+
+CHANNEL = 'notification_hub'
+# pg_notify payloads are limited to 8000 bytes; larger fan-outs broadcast
+MAX_RELAYED_USERS = 100
+
+
+class NotificationHub:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._broadcast = 0
+        self._per_user = {}
+        self._unread = {}
+        self.relay = None
+
+    def version(self, user_id):
+        with self._cond:
+            return self._broadcast + self._per_user.get(user_id, 0)
+
+    def publish(self, user_ids=None):
+        """Wake the streams of user_ids, or of every user when None."""
+        self.publish_local(user_ids)
+        if self.relay is not None:
+            self.relay.send(user_ids)
+
+    def publish_local(self, user_ids=None):
+        with self._cond:
+            if user_ids is None:
+                self._broadcast += 1
+                self._unread.clear()
+            else:
+                for user_id in user_ids:
+                    self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+                    self._unread.pop(user_id, None)
+            self._cond.notify_all()
+
+    def wait(self, user_id, seen_version, timeout):
+        """Block until user_id's version differs from seen_version.
+
+        Returns the new version, or None on timeout.
+        """
+        with self._cond:
+            changed = self._cond.wait_for(
+                lambda: self._broadcast + self._per_user.get(user_id, 0) != seen_version,
+                timeout=timeout
+            )
+            if not changed:
+                return None
+            return self._broadcast + self._per_user.get(user_id, 0)
+
+    def cached_unread(self, user_id):
+        with self._cond:
+            entry = self._unread.get(user_id)
+            if entry and entry[0] == self._broadcast + self._per_user.get(user_id, 0):
+                return entry[1]
+            return None
+
+    def store_unread(self, user_id, version, count):
+        with self._cond:
+            if version == self._broadcast + self._per_user.get(user_id, 0):
+                self._unread[user_id] = (version, count)
+
+
+class PgRelay:
+    """Forward hub publishes between worker processes.
+
+    ``send`` issues one ``pg_notify`` per publish; a daemon thread holding a
+    dedicated LISTEN connection replays publishes from other processes on
+    the local hub.
+    """
+
+    def __init__(self, hub, engine):
+        self.hub = hub
+        self.engine = engine
+        self.pid = os.getpid()
+
+    def start(self):
+        self.hub.relay = self
+        threading.Thread(target=self._listen_forever, name='notification-relay', daemon=True).start()
+
+    def send(self, user_ids):
+        if user_ids is not None and len(user_ids) > MAX_RELAYED_USERS:
+            user_ids = None
+        payload = json.dumps({'pid': self.pid, 'users': None if user_ids is None else list(user_ids)})
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                             {'channel': CHANNEL, 'payload': payload})
+        except Exception as e:
+            # Other workers still catch up through their streams' since cursors
+            print('notification relay send failed:', e)
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                print('notification relay lost its connection:', e)
+                # Streams may have missed publishes meanwhile; wake them all
+                self.hub.publish_local()
+                time.sleep(5)
+
+    def _listen(self):
+        raw = self.engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()  # a long-lived LISTEN connection must not go back to the pool
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            while True:
+                if not select.select([conn], [], [], 60)[0]:
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    data = json.loads(conn.notifies.pop(0).payload)
+                    if data.get('pid') != self.pid:
+                        self.hub.publish_local(data.get('users'))
+        finally:
+            conn.close()
+
+
+notification_hub = NotificationHub()
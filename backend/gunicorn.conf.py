@@ -0,0 +1,57 @@
+"""Gunicorn settings for the production entry point (wsgi:app).
+
+Every value can be overridden from the environment / .env:
+
+    WEB_BIND         address to listen on (0.0.0.0:5000)
+    WEB_WORKERS      worker processes (2 * CPU cores + 1)
+    WEB_THREADS      threads per worker (8); at most STREAM_SLOTS of them
+                     (half by default) wait in notification long-polls, for
+                     up to STREAM_WAIT_SECONDS each
+    WEB_TIMEOUT      seconds before a silent worker is restarted (60)
+    WEB_MAX_REQUESTS recycle a worker after this many requests (0 = never)
+"""
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 8))
+timeout = int(os.getenv('WEB_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+
+def on_starting(server):
+    if not os.getenv('SECRET_KEY'):
+        # Each worker would sign tokens with its own random key
+        raise RuntimeError('SECRET_KEY must be set when running several workers')
+    # Migrate once in the master instead of racing in every worker
+    from app import create_app, db
+    from metrics import reset as reset_metrics
+    from migrations import upgrade
+    app = create_app()
+    reset_metrics(app.instance_path)
+    with app.app_context():
+        upgrade(db.engine, log=server.log.info)
+        db.engine.dispose()
+
+
+def post_worker_init(worker):
+    from app import db
+    from jobs import runner
+    from wsgi import app
+    # Every worker serves the shared job queue
+    runner.start(app)
+    # Wake notification streams held by the other workers
+    if workers > 1:
+        from events import notification_hub, PgRelay
+        with app.app_context():
+            PgRelay(notification_hub, db.engine).start()
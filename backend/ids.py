@@ -0,0 +1,70 @@
+"""Application id allocation (APP000123 style).
+
+Ids come from a PostgreSQL sequence that advances in blocks of
+``BLOCK_SIZE``. Each worker process reserves one block with a single
+``nextval`` and hands the numbers out from memory, so inserting an
+application needs no lookup query and two workers can never pick the same
+id. Unused numbers of a block are simply skipped when a process exits.
+"""
+import os
+import threading
+
+from sqlalchemy import text
+
+SEQUENCE_NAME = 'application_id_seq'
+BLOCK_SIZE = 50
+
+
+class BlockAllocator:
+    def __init__(self, sequence=SEQUENCE_NAME, block_size=BLOCK_SIZE):
+        self.sequence = sequence
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        self._pid = None
+        self._ready = False
+
+    def _ensure_sequence(self, conn):
+        # Serialize first-time creation across workers; concurrent
+        # CREATE SEQUENCE IF NOT EXISTS can still race in PostgreSQL.
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': self.sequence})
+        if conn.execute(text("SELECT to_regclass(:name)"), {'name': self.sequence}).scalar():
+            return
+        # Start past every numeric id already handed out by the old random
+        # generator so existing rows can never collide with new ones.
+        start = conn.execute(text(
+            "SELECT COALESCE(MAX(CAST(SUBSTRING(id FROM 4) AS BIGINT)), 0) + 1 "
+            "FROM applications WHERE id ~ '^APP[0-9]+$'"
+        )).scalar()
+        conn.execute(text(
+            f"CREATE SEQUENCE IF NOT EXISTS {self.sequence} "
+            f"START WITH {int(start)} INCREMENT BY {self.block_size}"
+        ))
+
+    def _reserve_block(self, engine):
+        with engine.begin() as conn:
+            if not self._ready:
+                self._ensure_sequence(conn)
+                self._ready = True
+            start = conn.execute(text(f"SELECT nextval('{self.sequence}')")).scalar()
+        self._next = start
+        self._end = start + self.block_size
+
+    def next_number(self, engine):
+        with self._lock:
+            # A forked worker must not reuse the block reserved by its parent
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._next = self._end = 0
+            if self._next >= self._end:
+                self._reserve_block(engine)
+            number = self._next
+            self._next += 1
+            return number
+
+    def next_id(self, engine):
+        return f"APP{self.next_number(engine):06d}"
+
+
+application_ids = BlockAllocator()
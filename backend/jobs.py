@@ -0,0 +1,239 @@
+"""Background jobs without an external broker.
+
+Long work such as spreadsheet imports is stored as a row in ``jobs`` and run
+by a small thread pool inside each web process. A dispatcher thread claims
+queued rows with ``FOR UPDATE SKIP LOCKED``, so every gunicorn worker can
+serve the same queue without running a job twice, and it only claims a row
+when one of its ``JOB_WORKERS`` slots is free, which caps the concurrency per
+process. Failed jobs are retried with exponential backoff up to
+``max_attempts``; a job whose process died stops sending heartbeats and is
+requeued after ``JOB_STALE_SECONDS``. Clients poll ``GET /api/jobs/<id>``.
+
+Handlers are registered with ``@job_handler('name')`` and called as
+``fn(job, **payload)`` inside an app context. ``job.progress(done, total)``
+publishes progress, the return value (JSON) becomes the job's result, and
+raising ``PermanentJobError`` fails the job without further retries. Files a
+job needs are kept in ``<instance>/jobs/<id>/`` until it finishes.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import text
+from werkzeug.utils import secure_filename
+
+from models import db, Job
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 2))
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', 120))
+JOB_MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 5
+HEARTBEAT_SECONDS = 30
+PROGRESS_INTERVAL = 0.5
+
+log = logging.getLogger('jobs')
+_handlers = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (e.g. an unreadable file)."""
+
+
+def job_handler(name):
+    def register(fn):
+        _handlers[name] = fn
+        return fn
+    return register
+
+
+def job_folder(instance_path, job_id):
+    return os.path.join(instance_path, 'jobs', job_id)
+
+
+def enqueue(type_, payload=None, user_id=None, upload=None, max_attempts=JOB_MAX_ATTEMPTS):
+    """Store a queued job and wake the local runner; returns the Job.
+
+    upload, a FileStorage, is saved in the job's folder and its path passed
+    to the handler as ``path`` (with the original name as ``filename``).
+    """
+    app = current_app._get_current_object()
+    job_id = str(uuid.uuid4())
+    payload = dict(payload or {})
+    if upload is not None:
+        folder = job_folder(app.instance_path, job_id)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, secure_filename(upload.filename) or 'upload')
+        upload.save(path)
+        payload.update(path=path, filename=upload.filename)
+    now = datetime.utcnow()
+    job = Job(id=job_id, type=type_, status='queued', payload=payload, user_id=user_id,
+              max_attempts=max_attempts, created_at=now, run_after=now)
+    db.session.add(job)
+    db.session.commit()
+    runner.wake(app)
+    return job
+
+
+class JobHandle:
+    """What a handler sees of its job: the id and a progress reporter."""
+
+    def __init__(self, job_id, engine):
+        self.id = job_id
+        self._engine = engine
+        self._last = 0.0
+
+    def progress(self, done, total=None, force=False):
+        # Own connection: the handler's session holds its uncommitted work
+        now = time.monotonic()
+        if not force and now - self._last < PROGRESS_INTERVAL:
+            return
+        self._last = now
+        with self._engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE jobs SET progress = :done, total = COALESCE(:total, total), heartbeat_at = :now "
+                "WHERE id = :id"
+            ), {'done': done, 'total': total, 'now': datetime.utcnow(), 'id': self.id})
+
+
+def _claim(engine):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        return conn.execute(text(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+            "started_at = :now, heartbeat_at = :now, progress = 0 "
+            "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' AND run_after <= :now "
+            "ORDER BY run_after LIMIT 1 FOR UPDATE SKIP LOCKED) RETURNING id"
+        ), {'now': now}).scalar()
+
+
+def _heartbeat(engine, job_ids):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        if job_ids:
+            conn.execute(text("UPDATE jobs SET heartbeat_at = :now WHERE id = ANY(:ids)"),
+                         {'now': now, 'ids': list(job_ids)})
+        # Jobs of processes that died mid-run
+        conn.execute(text(
+            "UPDATE jobs SET error = 'worker stopped while running', "
+            "status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+            "run_after = :now, "
+            "finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE :now END "
+            "WHERE status = 'running' AND heartbeat_at < :cutoff"
+        ), {'now': now, 'cutoff': now - timedelta(seconds=JOB_STALE_SECONDS)})
+
+
+def _execute(app, job_id):
+    job = db.session.get(Job, job_id)
+    handler = _handlers.get(job.type)
+    payload = dict(job.payload or {})
+    try:
+        if handler is None:
+            raise PermanentJobError(f'unknown job type {job.type}')
+        result = handler(JobHandle(job_id, db.engine), **payload)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if isinstance(e, PermanentJobError):
+            log.warning('job %s (%s) failed: %s', job_id, job.type, e)
+        else:
+            log.exception('job %s (%s) failed', job_id, job.type)
+        job = db.session.get(Job, job_id)
+        job.error = str(e) if isinstance(e, PermanentJobError) else f'{type(e).__name__}: {e}'
+        now = datetime.utcnow()
+        if job.attempts < job.max_attempts and not isinstance(e, PermanentJobError):
+            job.status = 'queued'
+            job.run_after = now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = now
+        db.session.commit()
+    else:
+        job = db.session.get(Job, job_id)
+        job.status = 'succeeded'
+        job.result = result
+        job.error = None
+        if job.total is not None:
+            job.progress = job.total
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    if job.status in ('succeeded', 'failed'):
+        shutil.rmtree(job_folder(app.instance_path, job_id), ignore_errors=True)
+
+
+class JobRunner:
+    """Per-process dispatcher feeding a bounded thread pool, plus a heartbeat thread."""
+
+    def __init__(self, workers=JOB_WORKERS):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._running = set()
+
+    def start(self, app):
+        # Once per process; the pid check also covers gunicorn's fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._running = set()
+            threading.Thread(target=self._dispatch, args=(app,), name='job-dispatcher', daemon=True).start()
+            threading.Thread(target=self._beat, args=(app,), name='job-heartbeat', daemon=True).start()
+
+    def wake(self, app):
+        self.start(app)
+        self._wake.set()
+
+    def _dispatch(self, app):
+        slots = threading.BoundedSemaphore(self.workers)
+        executor = ThreadPoolExecutor(self.workers, thread_name_prefix='job')
+        while True:
+            slots.acquire()
+            job_id = None
+            try:
+                with app.app_context():
+                    job_id = _claim(db.engine)
+            except Exception:
+                log.exception('job dispatcher failed to poll')
+            if job_id is None:
+                slots.release()
+                self._wake.wait(JOB_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self._running.add(job_id)
+            executor.submit(self._run, app, job_id, slots)
+
+    def _beat(self, app):
+        # Separate from the dispatcher, which blocks while every slot is busy
+        # with a long job: those are exactly the jobs that need heartbeats
+        while True:
+            try:
+                with app.app_context():
+                    _heartbeat(db.engine, set(self._running))
+            except Exception:
+                log.exception('job heartbeat failed')
+            time.sleep(HEARTBEAT_SECONDS)
+
+    def _run(self, app, job_id, slots):
+        try:
+            with app.app_context():
+                _execute(app, job_id)
+        except Exception:
+            log.exception('job %s could not be finalised', job_id)
+        finally:
+            self._running.discard(job_id)
+            slots.release()
+            # A slot is free: look for the next job right away
+            self._wake.set()
+
+
+runner = JobRunner()
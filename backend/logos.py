@@ -0,0 +1,112 @@
+"""Content-addressed storage for university logos.
+
+Logos used to live inline in ``universities.logo`` as base64 data URLs, which
+made every catalog fetch carry the images. Inline images are now decoded,
+written once under ``uploads/logos/<sha256>.<ext>`` (plus a small thumbnail
+when Pillow is available) and the row keeps only the URL.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+
+LOGO_URL_PREFIX = '/api/logos/'
+MAX_LOGO_BYTES = 5 * 1024 * 1024
+THUMBNAIL_SIZE = (128, 128)
+
+_DATA_URL = re.compile(r'^data:(image/[\w.+-]+);base64,(.*)$', re.DOTALL)
+_EXTENSIONS = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/jpg': '.jpg',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/svg+xml': '.svg',
+}
+
+
+def logo_folder(root_path):
+    return os.path.join(root_path, 'uploads', 'logos')
+
+
+def thumbnail_name(filename):
+    return f"thumb_{filename}"
+
+
+def _write_thumbnail(folder, filename, data):
+    try:
+        from PIL import Image
+    except ImportError:
+        return
+    import io
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            image.save(os.path.join(folder, thumbnail_name(filename)))
+    except Exception:
+        pass  # unreadable/unsupported image: the full logo is still served
+
+
+def store_logo(value, root_path):
+    """Return the value to keep in universities.logo.
+
+    None/empty clears the logo, http(s) and already-stored URLs are kept
+    as they are, and data: URLs are written to disk once per distinct
+    content. Raises ValueError for malformed or oversized inline images.
+    """
+    if not value:
+        return None
+    if not value.startswith('data:'):
+        return value
+    match = _DATA_URL.match(value)
+    if not match or match.group(1) not in _EXTENSIONS:
+        raise ValueError('Unsupported logo format')
+    try:
+        data = base64.b64decode(match.group(2), validate=False)
+    except (binascii.Error, ValueError):
+        raise ValueError('Invalid base64 logo')
+    if len(data) > MAX_LOGO_BYTES:
+        raise ValueError('Logo is too large')
+
+    filename = hashlib.sha256(data).hexdigest() + _EXTENSIONS[match.group(1)]
+    folder = logo_folder(root_path)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, filename)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+        if not filename.endswith('.svg'):
+            _write_thumbnail(folder, filename, data)
+    return LOGO_URL_PREFIX + filename
+
+
+def thumbnail_url(logo):
+    """URL of the thumbnail for a stored logo; external URLs are returned as is.
+
+    The logo route falls back to the full image when no thumbnail was
+    written, so this needs no filesystem check.
+    """
+    if not logo or not logo.startswith(LOGO_URL_PREFIX):
+        return logo
+    return LOGO_URL_PREFIX + thumbnail_name(logo[len(LOGO_URL_PREFIX):])
+
+
+def remove_logos(logos, root_path):
+    """Delete the stored files (and thumbnails) behind logo URLs.
+
+    The caller passes only logos no university references any more;
+    external URLs are ignored.
+    """
+    folder = logo_folder(root_path)
+    for logo in logos:
+        if not logo or not logo.startswith(LOGO_URL_PREFIX):
+            continue
+        filename = os.path.basename(logo[len(LOGO_URL_PREFIX):])
+        for name in (filename, thumbnail_name(filename)):
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
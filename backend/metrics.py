@@ -0,0 +1,247 @@
+"""Request and SQL instrumentation exposed in Prometheus text format.
+
+For every request to the ``api`` blueprint the process records its latency
+in a per-endpoint histogram and, through SQLAlchemy engine events, how many
+SQL statements it ran and how long they took. Statements slower than
+``SLOW_QUERY_MS`` are written to the ``slow_query`` logger together with the
+endpoint that issued them.
+
+The hot path only touches thread-local counters and a few dict entries under
+one lock. Each worker process periodically writes its totals to
+``<instance>/metrics/<pid>.json`` and ``GET /metrics`` adds up all files, so
+a scrape that lands on any worker sees the whole server. Counters of workers
+that have exited stay in the sum; the directory is cleared when the server
+starts.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+from flask import Response, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+# Latency histogram bucket bounds in seconds (+Inf is implicit)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+slow_query_log = logging.getLogger('slow_query')
+_local = threading.local()
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}   # (endpoint, method) -> [bucket counts..., +Inf, sum]
+        self.requests = {}  # (endpoint, method, status) -> count
+        self.sql = {}       # endpoint -> [statements, seconds, slow statements]
+
+    def observe(self, endpoint, method, status, seconds, statements, sql_seconds, slow):
+        with self._lock:
+            hist = self.latency.get((endpoint, method))
+            if hist is None:
+                hist = self.latency[(endpoint, method)] = [0] * (len(BUCKETS) + 1) + [0.0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist[i] += 1
+                    break
+            else:
+                hist[len(BUCKETS)] += 1
+            hist[-1] += seconds
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            totals = self.sql.get(endpoint)
+            if totals is None:
+                totals = self.sql[endpoint] = [0, 0.0, 0]
+            totals[0] += statements
+            totals[1] += sql_seconds
+            totals[2] += slow
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'latency': [[list(k), v[:]] for k, v in self.latency.items()],
+                'requests': [[list(k), v] for k, v in self.requests.items()],
+                'sql': [[k, v[:]] for k, v in self.sql.items()],
+            }
+
+
+registry = Registry()
+
+
+def metrics_folder(instance_path):
+    return os.path.join(instance_path, 'metrics')
+
+
+def reset(instance_path):
+    """Drop the totals of previous server runs; call once before workers start."""
+    shutil.rmtree(metrics_folder(instance_path), ignore_errors=True)
+
+
+def _write_snapshot(folder):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f'{os.getpid()}.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(registry.snapshot(), fh)
+    os.replace(tmp_path, path)
+
+
+class _Flusher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self, app):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            folder = metrics_folder(app.instance_path)
+            threading.Thread(target=self._run, args=(folder,), name='metrics-flush', daemon=True).start()
+
+    def _run(self, folder):
+        while True:
+            time.sleep(FLUSH_SECONDS)
+            try:
+                _write_snapshot(folder)
+            except OSError:
+                pass
+
+
+_flusher = _Flusher()
+
+
+# SQL statements: counted on the thread that runs them
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _local.query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = getattr(_local, 'stats', None)
+    elapsed = time.perf_counter() - getattr(_local, 'query_start', time.perf_counter())
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        if stats is not None:
+            stats[2] += 1
+        slow_query_log.warning('%.1f ms %s %s', elapsed * 1000,
+                               getattr(_local, 'endpoint', None) or '-', ' '.join(statement.split()))
+
+
+def _start_request():
+    if request.blueprint != 'api':
+        return
+    _flusher.ensure_started(current_app)
+    _local.stats = [0, 0.0, 0]
+    _local.endpoint = request.endpoint
+    g.metrics_start = time.perf_counter()
+
+
+def _finish_request(status):
+    start = g.pop('metrics_start', None)
+    stats = getattr(_local, 'stats', None)
+    _local.stats = None
+    _local.endpoint = None
+    if start is None or stats is None:
+        return
+    registry.observe(request.endpoint or 'unmatched', request.method, status,
+                     time.perf_counter() - start, stats[0], stats[1], stats[2])
+
+
+def _after_request(response):
+    _finish_request(response.status_code)
+    return response
+
+
+def _teardown_request(exc):
+    # Only still pending when the view raised before a response was made
+    if exc is not None:
+        _finish_request(500)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _merged(folder):
+    latency, requests, sql = {}, {}, {}
+    try:
+        names = [n for n in os.listdir(folder) if n.endswith('.json')]
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        try:
+            with open(os.path.join(folder, name)) as fh:
+                snap = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        for key, values in snap['latency']:
+            current = latency.setdefault(tuple(key), [0] * len(values))
+            latency[tuple(key)] = [a + b for a, b in zip(current, values)]
+        for key, count in snap['requests']:
+            requests[tuple(key)] = requests.get(tuple(key), 0) + count
+        for key, values in snap['sql']:
+            current = sql.setdefault(key, [0] * len(values))
+            sql[key] = [a + b for a, b in zip(current, values)]
+    return latency, requests, sql
+
+
+def render(folder):
+    _write_snapshot(folder)
+    latency, requests, sql = _merged(folder)
+    lines = [
+        '# HELP http_request_duration_seconds Latency of API requests.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for (endpoint, method), values in sorted(latency.items()):
+        labels = f'endpoint="{_label(endpoint)}",method="{method}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), values[:-1]):
+            cumulative += count
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'http_request_duration_seconds_sum{{{labels}}} {values[-1]:.6f}')
+        lines.append(f'http_request_duration_seconds_count{{{labels}}} {cumulative}')
+    lines += ['# HELP http_requests_total API requests by response status.',
+              '# TYPE http_requests_total counter']
+    for (endpoint, method, status), count in sorted(requests.items()):
+        lines.append(f'http_requests_total{{endpoint="{_label(endpoint)}",method="{method}",status="{status}"}} {count}')
+    for index, (name, kind, help_text) in enumerate((
+            ('db_statements_total', 'counter', 'SQL statements run by API requests.'),
+            ('db_statement_seconds_total', 'counter', 'Time spent in SQL statements by API requests.'),
+            ('db_slow_statements_total', 'counter', f'SQL statements slower than {SLOW_QUERY_MS:g} ms.'))):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for endpoint, values in sorted(sql.items()):
+            value = values[index]
+            lines.append(f'{name}{{endpoint="{_label(endpoint)}"}} '
+                         + (f'{value:.6f}' if isinstance(value, float) else f'{value}'))
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('unauthorized\n', status=401, mimetype='text/plain')
+    body = render(metrics_folder(current_app.instance_path))
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    app.before_request(_start_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    log_path = os.getenv('SLOW_QUERY_LOG')
+    if log_path and not slow_query_log.handlers:
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_query_log.addHandler(handler)
@@ -0,0 +1,17 @@
+"""Apply pending schema migrations (see migrations.py).
+
+    python migrate.py           # upgrade to the latest version
+    python migrate.py --status  # print the applied and latest versions
+"""
+import sys
+
+from app import create_app, db
+from migrations import upgrade, current_version, LATEST_VERSION
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        if '--status' in sys.argv[1:]:
+            print(f'schema version {current_version(db.engine)} (latest {LATEST_VERSION})')
+        else:
+            print(f'schema version {upgrade(db.engine)}')
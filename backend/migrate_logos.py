@@ -0,0 +1,22 @@
+from app import create_app, db
+from models import University
+from logos import store_logo
+
+# Move inline base64 logos out of universities.logo into uploads/logos/
+app = create_app()
+with app.app_context():
+    # Load one logo at a time; inline images can be several MB each
+    ids = [uni_id for (uni_id,) in db.session.query(University.id).filter(University.logo.like('data:%'))]
+    print('Inline logos found:', len(ids))
+    migrated = 0
+    for uni_id in ids:
+        logo = db.session.query(University.logo).filter_by(id=uni_id).scalar()
+        try:
+            url = store_logo(logo, app.root_path)
+        except ValueError as e:
+            print('Skipping', uni_id, '-', e)
+            continue
+        University.query.filter_by(id=uni_id).update({'logo': url}, synchronize_session=False)
+        db.session.commit()
+        migrated += 1
+    print('Migrated', migrated, 'logos')
@@ -0,0 +1,47 @@
+import hashlib
+import os
+from sqlalchemy import text
+from app import create_app, db
+from migrations import upgrade
+from models import Application
+from storage import parse_entry, blobs_folder, blob_path, uploads_folder, CHUNK_SIZE
+
+# Move legacy <uuid>_<name> uploads into the content-addressed blob store.
+# Byte-identical files collapse into one blob with a reference count.
+app = create_app()
+with app.app_context():
+    upgrade(db.engine)  # upload_blobs comes with the versioned schema
+    os.makedirs(blobs_folder(app.root_path), exist_ok=True)
+    moved = []
+    rows = db.session.query(Application.id, Application.files).filter(Application.files.isnot(None)).all()
+    for app_id, files in rows:
+        new_files = []
+        for entry in files:
+            legacy = os.path.join(uploads_folder(app.root_path), entry)
+            if parse_entry(entry) or not os.path.exists(legacy):
+                new_files.append(entry)
+                continue
+            digest = hashlib.sha256()
+            size = 0
+            with open(legacy, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    size += len(chunk)
+            digest = digest.hexdigest()
+            db.session.execute(text(
+                "INSERT INTO upload_blobs (hash, size, ref_count) VALUES (:hash, :size, 1) "
+                "ON CONFLICT (hash) DO UPDATE SET ref_count = upload_blobs.ref_count + 1"
+            ), {'hash': digest, 'size': size})
+            if not os.path.exists(blob_path(app.root_path, digest)):
+                os.replace(legacy, blob_path(app.root_path, digest))
+            else:
+                moved.append(legacy)
+            new_files.append(f"{digest}_{entry.split('_', 1)[1] if '_' in entry else entry}")
+        if new_files != list(files):
+            Application.query.filter_by(id=app_id).update({'files': new_files}, synchronize_session=False)
+            db.session.commit()
+            print('Migrated files of', app_id)
+    # Duplicates are only removed once every reference points at a blob
+    for legacy in moved:
+        os.remove(legacy)
+    print('Removed', len(moved), 'duplicate files')
@@ -0,0 +1,175 @@
+"""Versioned schema migrations.
+
+The applied version is stored in the one-row ``schema_version`` table. On
+startup ``upgrade`` reads it with a single query and returns straight away
+when nothing is pending, so a booting worker no longer inspects tables or
+issues speculative ``ALTER TABLE``s. Pending steps run in order, each in its
+own transaction together with the version bump, under an advisory lock so
+workers starting at the same time apply them once.
+
+To change the schema, append a new step to ``MIGRATIONS``; never edit or
+reorder steps that have already shipped.
+"""
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from app import db
+import models  # noqa: F401  (registers the tables and their indexes)
+
+LOCK_KEY = 'schema_version'
+
+# Columns that older databases stored as ISO strings
+TIMESTAMP_COLUMNS = ['applications', 'application_messages', 'notifications']
+
+
+def _create_tables(conn):
+    db.metadata.create_all(bind=conn)
+
+
+def _user_contact_columns(conn):
+    conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS phone VARCHAR"))
+    conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS country_code VARCHAR"))
+
+
+def _university_logo_city(conn):
+    conn.execute(text("ALTER TABLE universities ADD COLUMN IF NOT EXISTS logo TEXT"))
+    conn.execute(text("ALTER TABLE universities ADD COLUMN IF NOT EXISTS city VARCHAR NOT NULL DEFAULT ''"))
+
+
+def _timestamp_created_at(conn):
+    for table in TIMESTAMP_COLUMNS:
+        data_type = conn.execute(text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = :table AND column_name = 'created_at'"
+        ), {'table': table}).scalar()
+        if data_type and not data_type.startswith('timestamp'):
+            conn.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN created_at TYPE TIMESTAMP "
+                f"USING created_at::timestamp"
+            ))
+
+
+def _model_indexes(conn):
+    # create_all only indexes tables it creates; add them to older tables
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+# (table, column, referenced table, ON DELETE rule); mirrors the models
+FOREIGN_KEY_RULES = [
+    ('programs', 'university_id', 'universities', 'CASCADE'),
+    ('students', 'user_id', 'users', 'SET NULL'),
+    ('applications', 'student_id', 'students', 'CASCADE'),
+    ('applications', 'program_id', 'programs', 'CASCADE'),
+    ('applications', 'user_id', 'users', 'SET NULL'),
+    ('application_messages', 'application_id', 'applications', 'CASCADE'),
+    ('notifications', 'user_id', 'users', 'CASCADE'),
+]
+
+
+def _foreign_key_rules(conn):
+    for table, column, referenced, rule in FOREIGN_KEY_RULES:
+        names = conn.execute(text(
+            "SELECT c.conname FROM pg_constraint c "
+            "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey) "
+            "WHERE c.contype = 'f' AND c.conrelid = CAST(:table AS regclass) AND a.attname = :column"
+        ), {'table': table, 'column': column}).scalars().all()
+        for name in names:
+            conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fkey FOREIGN KEY ({column}) "
+            f"REFERENCES {referenced} (id) ON DELETE {rule}"
+        ))
+
+
+# Typo-tolerant search indexes, created by migrate_indexes.py when the
+# pg_trgm extension is available
+TRIGRAM_SEARCH_INDEXES = [
+    ('ix_students_search_trgm', models.STUDENT_SEARCH_COLUMNS),
+    ('ix_programs_search_trgm', models.PROGRAM_SEARCH_COLUMNS),
+    ('ix_universities_search_trgm', models.UNIVERSITY_SEARCH_COLUMNS),
+]
+
+
+def trigram_index(name, columns):
+    document = models.search_document(*columns).label('document')
+    return db.Index(name, document, postgresql_using='gin', postgresql_ops={'document': 'gin_trgm_ops'})
+
+
+def _rebuild_search_indexes(conn):
+    # The indexed expression folds letters with models.SEARCH_FOLD_*; indexes
+    # built with an older fold would no longer match the queries
+    search_indexes = [index for table in db.metadata.sorted_tables for index in table.indexes
+                      if index.name.endswith('_search')]
+    for index in search_indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        index.create(bind=conn)
+    for name, columns in TRIGRAM_SEARCH_INDEXES:
+        if conn.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar():
+            conn.execute(text(f"DROP INDEX {name}"))
+            trigram_index(name, columns).create(bind=conn)
+
+
+def _default_admin(conn):
+    from auth import hash_password
+    conn.execute(text(
+        "INSERT INTO users (id, name, email, password, role) "
+        "SELECT '1', 'admin', 'admin@admin.com', :password, 'ADMIN' "
+        "WHERE NOT EXISTS (SELECT 1 FROM users WHERE email = 'admin@admin.com' OR id = '1')"
+    ), {'password': hash_password('admin')})
+
+
+# (version, description, step)
+MIGRATIONS = [
+    (1, 'create tables', _create_tables),
+    (2, 'users.phone and users.country_code', _user_contact_columns),
+    (3, 'universities.logo and universities.city', _university_logo_city),
+    (4, 'created_at columns as TIMESTAMP', _timestamp_created_at),
+    (5, 'model indexes', _model_indexes),
+    (6, 'default admin user', _default_admin),
+    (7, 'notification retention index', _model_indexes),
+    (8, 'jobs table', _create_tables),
+    (9, 'ON DELETE rules on foreign keys', _foreign_key_rules),
+    (10, 'search indexes with the ة/ه fold', _rebuild_search_indexes),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(engine):
+    """Applied schema version; 0 for a database that predates the runner."""
+    with engine.connect() as conn:
+        try:
+            return conn.execute(text("SELECT version FROM schema_version")).scalar() or 0
+        except ProgrammingError:
+            return 0
+
+
+def upgrade(engine, log=print):
+    """Apply pending migrations and return the resulting version."""
+    if current_version(engine) >= LATEST_VERSION:
+        return LATEST_VERSION
+    # Session-level lock held on its own connection for the whole run
+    with engine.connect() as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), {'key': LOCK_KEY})
+        lock_conn.commit()
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+                conn.execute(text(
+                    "INSERT INTO schema_version (version) SELECT 0 "
+                    "WHERE NOT EXISTS (SELECT 1 FROM schema_version)"
+                ))
+            version = current_version(engine)
+            for number, description, step in MIGRATIONS:
+                if number <= version:
+                    continue
+                log(f'Applying migration {number}: {description}')
+                with engine.begin() as conn:
+                    step(conn)
+                    conn.execute(text("UPDATE schema_version SET version = :v"), {'v': number})
+                version = number
+            return version
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {'key': LOCK_KEY})
+            lock_conn.commit()
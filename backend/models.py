@@ -1,6 +1,28 @@
 
 from app import db
 
+# Arabic letter variants folded together so أحمد, احمد and إحمد match, and
+# so do فاطمة and فاطمه. The search indexes are built on this expression:
+# changing it needs a migration that rebuilds them (see migrations.py).
+SEARCH_FOLD_FROM = 'أإآىة'
+SEARCH_FOLD_TO = 'ااايه'
+
+
+def search_document(*columns):
+    """Normalized text of columns for full-text search.
+
+    Only immutable functions are used so the same expression can back a
+    GIN expression index and be matched by the planner in queries.
+    """
+    text = db.func.coalesce(columns[0], '')
+    for column in columns[1:]:
+        text = text.op('||')(' ').op('||')(db.func.coalesce(column, ''))
+    return db.func.translate(db.func.lower(text), SEARCH_FOLD_FROM, SEARCH_FOLD_TO)
+
+
+def search_vector(*columns):
+    return db.func.to_tsvector(db.literal('simple', db.String), search_document(*columns))
+
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.String, primary_key=True)
@@ -26,7 +48,11 @@ class Student(db.Model):
     degree_target = db.Column(db.String, nullable=False)
     dob = db.Column(db.String, nullable=False)
     residence_country = db.Column(db.String, nullable=False)
-    user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=True)  # Added to link student to agent
+    user_id = db.Column(db.String, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True, index=True)  # Added to link student to agent
+
+    __table_args__ = (
+        db.Index('ix_students_nationality', 'nationality'),
+    )
 
 class University(db.Model):
     __tablename__ = 'universities'
@@ -41,7 +67,7 @@ class University(db.Model):
 class Program(db.Model):
     __tablename__ = 'programs'
     id = db.Column(db.String, primary_key=True)
-    university_id = db.Column(db.String, db.ForeignKey('universities.id'), nullable=False)
+    university_id = db.Column(db.String, db.ForeignKey('universities.id', ondelete='CASCADE'), nullable=False, index=True)
     name = db.Column(db.String, nullable=False)
     degree = db.Column(db.String, nullable=False)
     language = db.Column(db.String, nullable=False)
@@ -54,32 +80,96 @@ class Program(db.Model):
 class Application(db.Model):
     __tablename__ = 'applications'
     id = db.Column(db.String, primary_key=True)
-    student_id = db.Column(db.String, db.ForeignKey('students.id'), nullable=False)
-    program_id = db.Column(db.String, db.ForeignKey('programs.id'), nullable=False)
-    status = db.Column(db.String, nullable=False)
-    semester = db.Column(db.String, nullable=False)
-    created_at = db.Column(db.String, nullable=False)
+    # Deletes go through deletes.py, which removes applications itself so
+    # their uploads are released; the cascades only keep the tables consistent.
+    student_id = db.Column(db.String, db.ForeignKey('students.id', ondelete='CASCADE'), nullable=False, index=True)
+    program_id = db.Column(db.String, db.ForeignKey('programs.id', ondelete='CASCADE'), nullable=False, index=True)
+    status = db.Column(db.String, nullable=False, index=True)
+    semester = db.Column(db.String, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False)
     files = db.Column(db.ARRAY(db.String))
-    user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=True)  # Added to link application to agent
+    user_id = db.Column(db.String, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)  # Added to link application to agent
     user = db.relationship('User', backref='applications')
 
+    # Listing order is (created_at DESC, id DESC), optionally scoped to an agent
+    __table_args__ = (
+        db.Index('ix_applications_created_at_id', db.text('created_at DESC'), db.text('id DESC')),
+        db.Index('ix_applications_user_id_created_at', 'user_id', db.text('created_at DESC'), db.text('id DESC')),
+    )
+
 
 
 class ApplicationMessage(db.Model):
     __tablename__ = 'application_messages'
     id = db.Column(db.String, primary_key=True)
-    application_id = db.Column(db.String, db.ForeignKey('applications.id'), nullable=False)
+    application_id = db.Column(db.String, db.ForeignKey('applications.id', ondelete='CASCADE'), nullable=False)
     sender = db.Column(db.String, nullable=False)  # 'ADMIN' or 'USER'
     message = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.String, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_application_messages_application_id_created_at', 'application_id', 'created_at'),
+    )
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
     id = db.Column(db.String, primary_key=True)
-    user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.String, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     title = db.Column(db.String, nullable=False)
     message = db.Column(db.String, nullable=False)
     link = db.Column(db.String, nullable=True)
     is_read = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.String, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
     type = db.Column(db.String, nullable=False) # 'MESSAGE', 'STATUS'
+
+    __table_args__ = (
+        db.Index('ix_notifications_user_id_created_at', 'user_id', db.text('created_at DESC')),
+        # Small partial index behind the unread counter
+        db.Index('ix_notifications_user_id_unread', 'user_id',
+                 postgresql_where=db.text('NOT is_read')),
+        # Lets retention find old read rows without scanning unread ones
+        db.Index('ix_notifications_read_created_at', 'created_at',
+                 postgresql_where=db.text('is_read')),
+    )
+
+class UploadBlob(db.Model):
+    __tablename__ = 'upload_blobs'
+    hash = db.Column(db.String, primary_key=True)  # sha256 of the file content
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # entries in applications.files
+
+
+class Job(db.Model):
+    """A unit of background work; see jobs.py."""
+    __tablename__ = 'jobs'
+    id = db.Column(db.String, primary_key=True)
+    type = db.Column(db.String, nullable=False)
+    status = db.Column(db.String, nullable=False, default='queued')  # queued, running, succeeded, failed
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    user_id = db.Column(db.String, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    run_after = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # The claim query only looks at queued rows, in run_after order
+        db.Index('ix_jobs_queued_run_after', 'run_after', postgresql_where=db.text("status = 'queued'")),
+    )
+
+
+# Full-text search indexes behind /api/search
+STUDENT_SEARCH_COLUMNS = (Student.first_name, Student.last_name, Student.passport_number, Student.email, Student.phone)
+PROGRAM_SEARCH_COLUMNS = (Program.name, Program.degree, Program.language)
+UNIVERSITY_SEARCH_COLUMNS = (University.name, University.city, University.country)
+
+db.Index('ix_students_search', search_vector(*STUDENT_SEARCH_COLUMNS), postgresql_using='gin')
+db.Index('ix_programs_search', search_vector(*PROGRAM_SEARCH_COLUMNS), postgresql_using='gin')
+db.Index('ix_universities_search', search_vector(*UNIVERSITY_SEARCH_COLUMNS), postgresql_using='gin')
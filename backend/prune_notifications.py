@@ -0,0 +1,22 @@
+"""Delete old read notifications in batches (see retention.py).
+
+    python prune_notifications.py [--days 90] [--batch-size 5000] [--pause 0.1]
+
+Safe to run while the app is serving; schedule it daily, e.g. from cron.
+"""
+import argparse
+
+from app import create_app, db
+from retention import prune_read_notifications, RETENTION_DAYS, BATCH_SIZE
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=RETENTION_DAYS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--pause', type=float, default=0.0,
+                        help='seconds to sleep between batches')
+    args = parser.parse_args()
+    app = create_app()
+    with app.app_context():
+        total = prune_read_notifications(db.engine, args.days, args.batch_size, args.pause, log=print)
+        print(f'pruned {total} read notifications older than {args.days} days')
@@ -0,0 +1,38 @@
+"""Retention for notifications.
+
+Every status change and message adds notification rows that used to be kept
+forever. ``prune_read_notifications`` deletes read notifications older than
+``NOTIFICATION_RETENTION_DAYS`` in batches, each in its own short
+transaction, so it can run against a live database without holding long
+locks or building one huge transaction. Unread notifications are never
+pruned. Run it from cron through prune_notifications.py.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+BATCH_SIZE = 5000
+
+
+def prune_read_notifications(engine, days=RETENTION_DAYS, batch_size=BATCH_SIZE, pause=0.0, log=None):
+    """Delete read notifications older than days; returns the number deleted."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            # Served by ix_notifications_read_created_at
+            deleted = conn.execute(text(
+                "DELETE FROM notifications WHERE id IN ("
+                "SELECT id FROM notifications WHERE is_read AND created_at < :cutoff "
+                "LIMIT :batch FOR UPDATE SKIP LOCKED)"
+            ), {'cutoff': cutoff, 'batch': batch_size}).rowcount
+        total += deleted
+        if log:
+            log(f'deleted {deleted} (total {total})')
+        if deleted < batch_size:
+            return total
+        if pause:
+            time.sleep(pause)
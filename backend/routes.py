@@ -1,15 +1,209 @@
 
-from flask import Blueprint, request, jsonify, session, current_app, send_from_directory, url_for
-from models import db, Student, University, Program, Application, User, Notification
+from flask import Blueprint, request, jsonify, session, current_app, send_from_directory, url_for, Response, stream_with_context, g
+from models import (db, Student, University, Program, Application, User, Notification, Job,
+                    search_document, search_vector, SEARCH_FOLD_FROM, SEARCH_FOLD_TO,
+                    STUDENT_SEARCH_COLUMNS, PROGRAM_SEARCH_COLUMNS, UNIVERSITY_SEARCH_COLUMNS)
+from events import notification_hub
+from logos import store_logo, logo_folder, remove_logos
+from cache import cached_json, invalidate
+from ids import application_ids
+from payloads import parse_fields, encode
+from serializers import USER, STUDENT, UNIVERSITY, PROGRAM, APPLICATION, MESSAGE, NOTIFICATION
+from storage import save_upload, release_upload, remove_uploads, parse_entry, display_name, blobs_folder
+from migrations import LATEST_VERSION
+from exports import export_response, EXPORT_FORMATS
+from deletes import delete_programs, delete_universities, delete_users
+from jobs import enqueue, job_handler, PermanentJobError
+from auth import (principal_from_request, principals, issue_token, hash_password, check_password,
+                  TOKEN_COOKIE, TOKEN_MAX_AGE)
+import re
 import uuid
+import json
+import threading
+import base64
+import tempfile
 from datetime import datetime
+import psycopg2
+from sqlalchemy import tuple_, select, literal, cast, func, String, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 from werkzeug.utils import secure_filename
 
 api_bp = Blueprint('api', __name__)
 
+# Reachable without a session token
+PUBLIC_ENDPOINTS = {'api.login', 'api.logout', 'api.upload_file', 'api.logo_file', 'api.health', 'api.ready'}
+
+
+@api_bp.before_request
+def _load_principal():
+    g.principal = principal_from_request()
+    if (g.principal is None and current_app.config.get('AUTH_REQUIRED')
+            and request.method != 'OPTIONS' and request.endpoint not in PUBLIC_ENDPOINTS):
+        return jsonify({'message': 'Authentication required'}), 401
+
+
+def _caller(source):
+    """(role, user_id) of the caller; a session token wins over request params.
+
+    The params are only read when AUTH_REQUIRED is off.
+    """
+    principal = g.principal
+    if principal is not None:
+        return principal.role, principal.id
+    if current_app.config.get('AUTH_REQUIRED'):
+        return None, None
+    return source.get('role'), source.get('user_id')
+
+
+def _scoped_args(args):
+    # Query helpers read role/user_id from args; pin them to the token's user
+    principal = g.principal
+    if principal is None:
+        return args
+    args = args.copy()
+    args['role'] = principal.role
+    args['user_id'] = principal.id
+    return args
+
+
+def _is_admin():
+    # Never trusts request params: user data always needs a token
+    return g.principal is not None and g.principal.role == 'ADMIN'
+
+
+def _forbidden_unless_admin():
+    if g.principal is None:
+        return jsonify({'message': 'Authentication required'}), 401
+    if not _is_admin():
+        return jsonify({'message': 'Admins only'}), 403
+    return None
+
+
+def _batch_ids():
+    """Read {"ids": [...]} from a batch request body; returns (data, ids, error)."""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, str) for i in ids):
+        return data, None, 'ids must be a non-empty list of strings'
+    return data, list(dict.fromkeys(ids)), None
+
+LOGO_MAX_AGE = 365 * 24 * 3600
+
+# Keyset pagination: list endpoints accept ?limit=&after=. Without limit they
+# keep returning the full array for older clients.
+MAX_PAGE_SIZE = 500
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _parse_timestamp(value):
+    """Parse an ISO timestamp from a query string; None if missing or invalid."""
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':'), default=_iso).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor, sort_cols):
+    """Values of a cursor made by _encode_cursor for sort_cols, or None.
+
+    A cursor must hold one value of the right type per sort column;
+    timestamps are parsed back into datetimes.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        return None
+    if not isinstance(values, list) or len(values) != len(sort_cols):
+        return None
+    decoded = []
+    for value, column in zip(values, sort_cols):
+        python_type = column.type.python_type
+        if python_type is datetime:
+            value = _parse_timestamp(value) if isinstance(value, str) else None
+        elif not isinstance(value, python_type) or isinstance(value, bool):
+            value = None
+        if value is None:
+            return None
+        decoded.append(value)
+    return decoded
+
+
+def _page_args(sort_cols, cursor_param='after'):
+    """Read ?limit=&after= (or another cursor_param) from the query string.
+
+    Returns (limit, after, error). limit is None when the caller did not ask
+    for pagination; after holds one value per column of sort_cols.
+    """
+    raw_limit = request.args.get('limit')
+    if raw_limit is None or raw_limit == '':
+        return None, None, None
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        return None, None, 'limit must be an integer'
+    if limit < 1:
+        return None, None, 'limit must be positive'
+    limit = min(limit, MAX_PAGE_SIZE)
+    after = None
+    if request.args.get(cursor_param):
+        after = _decode_cursor(request.args[cursor_param], sort_cols)
+        if after is None:
+            return None, None, 'invalid cursor'
+    return limit, after, None
+
+
+def _keyset_page(query, sort_cols, limit, after, descending=False):
+    """Apply a stable keyset page to query ordered by sort_cols.
+
+    sort_cols must end with a unique column so the order is total; after
+    comes from _page_args with the same sort_cols. Returns (rows, next_cursor).
+    """
+    key = tuple_(*sort_cols)
+    if after is not None:
+        bound = tuple_(*[literal(v, c.type) for v, c in zip(after, sort_cols)])
+        query = query.filter(key < bound if descending else key > bound)
+    order = [c.desc() for c in sort_cols] if descending else list(sort_cols)
+    rows = query.order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(getattr(last, c.key) for c in sort_cols)
+    return rows, next_cursor
+
+# Liveness: answers without touching the database
+@api_bp.route('/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'ok'})
+
+
+# Readiness: one round trip that also checks the schema is migrated
+@api_bp.route('/ready', methods=['GET'])
+def ready():
+    try:
+        version = db.session.execute(text("SELECT version FROM schema_version")).scalar() or 0
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'unavailable', 'message': e.__class__.__name__}), 503
+    if version < LATEST_VERSION:
+        return jsonify({'status': 'migrating', 'schemaVersion': version}), 503
+    return jsonify({'status': 'ok', 'schemaVersion': version})
+
 # إضافة مستخدم جديد (خاص بالمسؤول)
 @api_bp.route('/users', methods=['POST'])
 def add_user():
+    denied = _forbidden_unless_admin()
+    if denied:
+        return denied
     data = request.json
     if not data.get('name') or not data.get('email') or not data.get('password'):
         return jsonify({'message': 'يجب تعبئة جميع الحقول'}), 400
@@ -19,7 +213,7 @@ def add_user():
         id=str(uuid.uuid4()),
         name=data['name'],
         email=data['email'],
-        password=data['password'],
+        password=hash_password(data['password']),
         role=data.get('role', 'USER'),
         phone=data.get('phone'),
         country_code=data.get('countryCode')
@@ -31,14 +225,16 @@ def add_user():
 # تحديث الملف الشخصي (كلمة السر والهاتف)
 @api_bp.route('/users/update-profile', methods=['PUT'])
 def update_profile():
+    # Only the token's own user; never a user_id from the body
+    if g.principal is None:
+        return jsonify({'message': 'Authentication required'}), 401
     data = request.json
-    user_id = data.get('user_id')
-    user = User.query.get(user_id)
+    user = User.query.get(g.principal.id)
     if not user:
         return jsonify({'message': 'المستخدم غير موجود'}), 404
     
     if data.get('password'):
-        user.password = data['password']
+        user.password = hash_password(data['password'])
     
     if 'phone' in data:
         user.phone = data['phone']
@@ -46,31 +242,49 @@ def update_profile():
         user.country_code = data.get('countryCode')
         
     db.session.commit()
+    principals.invalidate(user.id)
     return jsonify({'message': 'تم تحديث البيانات بنجاح'}), 200
 
 # الحصول على جميع المستخدمين
 @api_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([{
-        'id': u.id,
-        'name': u.name,
-        'email': u.email,
-        'role': u.role,
-        'phone': u.phone,
-        'countryCode': getattr(u, 'country_code', None)
-    } for u in users])
+    denied = _forbidden_unless_admin()
+    if denied:
+        return denied
+    try:
+        plan = USER.plan(USER.parse(request.args.get('fields')))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify(plan.dicts(plan.select(User.query)))
 
 # حذف مستخدم
 @api_bp.route('/users/<user_id>', methods=['DELETE'])
 def delete_user(user_id):
-    user = User.query.get(user_id)
-    if not user:
+    denied = _forbidden_unless_admin()
+    if denied:
+        return denied
+    if not delete_users(db.session, [user_id]):
         return jsonify({'message': 'المستخدم غير موجود'}), 404
-    db.session.delete(user)
     db.session.commit()
+    principals.invalidate(user_id)
     return jsonify({'message': 'تم حذف المستخدم'}), 200
 
+
+# Batch delete: body {"ids": [...]}, one transaction, constant statement count
+@api_bp.route('/users', methods=['DELETE'])
+def delete_users_batch():
+    denied = _forbidden_unless_admin()
+    if denied:
+        return denied
+    _, ids, error = _batch_ids()
+    if error:
+        return jsonify({'message': error}), 400
+    deleted = delete_users(db.session, ids)
+    db.session.commit()
+    for user_id in deleted:
+        principals.invalidate(user_id)
+    return jsonify({'message': 'تم حذف المستخدمين', 'deleted': deleted}), 200
+
 # Login endpoint
 @api_bp.route('/login', methods=['POST'])
 def login():
@@ -78,59 +292,102 @@ def login():
     email = data.get('email')
     password = data.get('password')
     user = User.query.filter_by(email=email).first()
-    if user and user.password == password:
-        return jsonify({
+    matches, needs_rehash = check_password(user.password if user else None, password)
+    if matches:
+        if needs_rehash:
+            # Upgrade plain-text rows and hashes made with an older cost
+            user.password = hash_password(password)
+            db.session.commit()
+        token = issue_token(user)
+        response = jsonify({
             'success': True,
-            'user': {
-                'id': user.id,
-                'name': user.name,
-                'email': user.email,
-                'role': user.role,
-                'phone': user.phone,
-                'countryCode': getattr(user, 'country_code', None)
-            }
+            'token': token,
+            'user': USER.dump(user)
         })
+        response.set_cookie(TOKEN_COOKIE, token, max_age=TOKEN_MAX_AGE, httponly=True, samesite='Lax',
+                            secure=current_app.config.get('SESSION_COOKIE_SECURE', False))
+        return response
     return jsonify({'success': False, 'message': 'اسم المستخدم أو كلمة المرور غير صحيحة'}), 401
 
+
+@api_bp.route('/logout', methods=['POST'])
+def logout():
+    response = jsonify({'success': True})
+    response.delete_cookie(TOKEN_COOKIE, httponly=True, samesite='Lax')
+    return response
+
 # Students
 @api_bp.route('/students', methods=['GET'])
 def get_students():
-    user_role = request.args.get('role')
-    user_id = request.args.get('user_id')
-    if user_role == 'agent' and user_id:
-        students = Student.query.filter_by(user_id=user_id).all()
-    else:
-        students = Student.query.all()
-    # Debug log: show how many students returned and their user_ids
+    sort_cols = [Student.id]
+    limit, after, error = _page_args(sort_cols)
+    if error:
+        return jsonify({'message': error}), 400
     try:
-        print(f"GET /api/students called with role={user_role} user_id={user_id} -> returning {len(students)} students")
-        sample = [(s.id, getattr(s, 'user_id', None)) for s in students[:10]]
-        print('sample students (id,user_id)=', sample)
-    except Exception:
-        pass
-
-    return jsonify([{
-        'id': s.id,
-        'firstName': s.first_name,
-        'lastName': s.last_name,
-        'passportNumber': s.passport_number,
-        'fatherName': s.father_name,
-        'motherName': s.mother_name,
-        'gender': s.gender,
-        'phone': s.phone,
-        'email': s.email,
-        'nationality': s.nationality,
-        'degreeTarget': s.degree_target,
-        'dob': s.dob,
-        'residenceCountry': s.residence_country,
-        'userId': getattr(s, 'user_id', None)
-    } for s in students])
+        plan = STUDENT.plan(STUDENT.parse(request.args.get('fields')))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    query = plan.select(_students_query(_scoped_args(request.args)), *sort_cols)
+    next_cursor = None
+    if limit is None:
+        students = query.order_by(*sort_cols).all()
+    else:
+        students, next_cursor = _keyset_page(query, sort_cols, limit, after)
+    items = plan.dicts(students)
+    if limit is None:
+        return jsonify(items)
+    return jsonify({'items': items, 'nextCursor': next_cursor})
+
+
+def _students_query(args):
+    query = Student.query
+    if args.get('role') == 'agent' and args.get('user_id'):
+        query = query.filter_by(user_id=args['user_id'])
+    elif args.get('agent_id'):
+        query = query.filter_by(user_id=args['agent_id'])
+    if args.get('nationality'):
+        query = query.filter_by(nationality=args['nationality'])
+    return query
+
+
+def _export_format():
+    fmt = request.args.get('format', 'csv')
+    return fmt if fmt in EXPORT_FORMATS else None
+
+
+# Export headers match the import aliases, so an export can be re-imported
+STUDENT_EXPORT_COLUMNS = [
+    ('ID', Student.id),
+    ('First Name', Student.first_name),
+    ('Last Name', Student.last_name),
+    ('Passport', Student.passport_number),
+    ('Father Name', Student.father_name),
+    ('Mother Name', Student.mother_name),
+    ('Gender', Student.gender),
+    ('Phone', Student.phone),
+    ('Email', Student.email),
+    ('Nationality', Student.nationality),
+    ('Degree', Student.degree_target),
+    ('Date of Birth', Student.dob),
+    ('Residence Country', Student.residence_country),
+    ('Agent', User.name),
+]
+
+
+@api_bp.route('/students/export', methods=['GET'])
+def export_students():
+    fmt = _export_format()
+    if fmt is None:
+        return jsonify({'message': 'format must be csv or xlsx'}), 400
+    query = _students_query(_scoped_args(request.args)) \
+        .outerjoin(User, User.id == Student.user_id).order_by(Student.id)
+    return export_response('students', fmt, STUDENT_EXPORT_COLUMNS, query)
+
 
 @api_bp.route('/students', methods=['POST'])
 def add_student():
     data = request.json
-    user_role = data.get('role')
-    user_id = data.get('user_id')
+    user_role, user_id = _caller(data)
     if user_role == 'agent' and not user_id:
         return jsonify({'message': 'Agent user_id required'}), 400
     student = Student(
@@ -151,29 +408,89 @@ def add_student():
     )
     db.session.add(student)
     db.session.commit()
-    print(f"Created student {student.id} user_id={user_id}")
     return jsonify({'message': 'Student added', 'id': student.id}), 201
 
+
+@api_bp.route('/students/import', methods=['POST'])
+def import_students():
+    user_role, user_id = _caller(request.form)
+    if user_role == 'agent' and not user_id:
+        return jsonify({'message': 'Agent user_id required'}), 400
+    if 'file' not in request.files:
+        return jsonify({'message': 'No file uploaded'}), 400
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'message': 'No file selected'}), 400
+    ext = os.path.splitext(file.filename)[1].lower()
+    if ext not in ('.xlsx', '.xlsm', '.csv'):
+        return jsonify({'message': 'Unsupported file type, use .xlsx or .csv'}), 400
+    if request.args.get('async') == '1':
+        job = enqueue('import_students', {'user_id': user_id}, user_id=user_id, upload=file)
+        return _job_accepted(job)
+    try:
+        body = _import_students_file(file.stream, file.filename, user_id)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except (IntegrityError, psycopg2.IntegrityError):
+        # Another import added one of the passports after validation; COPY
+        # runs on the raw cursor, so the error comes straight from psycopg2
+        db.session.rollback()
+        return jsonify({'message': 'Some passports were added meanwhile, please retry the import'}), 409
+    return jsonify(body), 201
+
+
+def _import_students_file(source, filename, user_id, progress=None):
+    """Read, validate and insert a student sheet; returns the response body.
+
+    Raises ValueError for an unusable file and psycopg2.IntegrityError when
+    one of the passports was added by someone else after validation.
+    """
+    # pandas is only loaded once somebody imports a sheet
+    from student_import import read_student_sheet, validate_students, insert_students, MAX_IMPORT_ROWS
+    try:
+        frame = read_student_sheet(source, filename)
+    except Exception as e:
+        raise ValueError('Failed to read file: ' + str(e))
+    if len(frame) > MAX_IMPORT_ROWS:
+        raise ValueError(f'Too many rows, the limit is {MAX_IMPORT_ROWS}')
+    valid, rejected = validate_students(frame, db.session)
+    imported = insert_students(db.session, valid, user_id, progress)
+    db.session.commit()
+    return {
+        'message': f'Imported {imported} students',
+        'imported': imported,
+        'rejected': rejected
+    }
+
+
+@job_handler('import_students')
+def _import_students_job(job, path, filename, user_id=None):
+    # IntegrityError is left to the retry: the next attempt rejects those rows
+    try:
+        return _import_students_file(path, filename, user_id, job.progress)
+    except ValueError as e:
+        raise PermanentJobError(str(e))
+
 # Universities
 @api_bp.route('/universities', methods=['GET'])
 def get_universities():
-    universities = University.query.all()
-    return jsonify([{
-        'id': u.id,
-        'name': u.name,
-        'website': u.website,
-        'country': u.country,
-        'city': getattr(u, 'city', ''),
-        'description': u.description,
-        'logo': getattr(u, 'logo', None)
-    } for u in universities])
+    return cached_json('universities', _build_universities)
+
+
+def _build_universities():
+    plan = UNIVERSITY.plan()
+    return plan.dicts(plan.select(University.query).order_by(University.id))
 
 @api_bp.route('/universities', methods=['POST'])
 def add_university():
     data = request.json
-    user_role = data.get('role')
+    user_role, _ = _caller(data)
     if user_role == 'agent':
         return jsonify({'message': 'Agents are not allowed to add universities'}), 403
+    try:
+        logo = store_logo(data.get('logo'), current_app.root_path)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     university = University(
         id=str(uuid.uuid4()),
         name=data['name'],
@@ -181,33 +498,51 @@ def add_university():
         country=data['country'],
         city=data.get('city', ''),
         description=data['description'],
-        logo=data.get('logo')  # optional logo (base64 or URL)
+        logo=logo  # optional logo: stored URL or external URL
     )
     db.session.add(university)
     db.session.commit()
+    invalidate('universities')
     return jsonify({'message': 'University added', 'id': university.id, 'logo': university.logo}), 201
 
 # Programs
 @api_bp.route('/programs', methods=['GET'])
 def get_programs():
-    programs = Program.query.all()
-    return jsonify([{
-        'id': p.id,
-        'universityId': p.university_id,
-        'name': p.name,
-        'degree': p.degree,
-        'language': p.language,
-        'years': p.years,
-        'deadline': p.deadline,
-        'fee': p.fee,
-        'currency': getattr(p, 'currency', 'USD'),
-        'description': p.description
-    } for p in programs])
+    return cached_json('programs', _build_programs)
+
+
+def _build_programs():
+    plan = PROGRAM.plan()
+    return plan.dicts(plan.select(Program.query).order_by(Program.id))
+
+PROGRAM_EXPORT_COLUMNS = [
+    ('ID', Program.id),
+    ('Name', Program.name),
+    ('University ID', Program.university_id),
+    ('University', University.name),
+    ('Degree', Program.degree),
+    ('Language', Program.language),
+    ('Years', Program.years),
+    ('Deadline', Program.deadline),
+    ('Fee', Program.fee),
+    ('Currency', Program.currency),
+    ('Description', Program.description),
+]
+
+
+@api_bp.route('/programs/export', methods=['GET'])
+def export_programs():
+    fmt = _export_format()
+    if fmt is None:
+        return jsonify({'message': 'format must be csv or xlsx'}), 400
+    query = Program.query.outerjoin(University, University.id == Program.university_id).order_by(Program.id)
+    return export_response('programs', fmt, PROGRAM_EXPORT_COLUMNS, query)
+
 
 @api_bp.route('/programs', methods=['POST'])
 def add_program():
     data = request.json
-    user_role = data.get('role')
+    user_role, _ = _caller(data)
     if user_role == 'agent':
         return jsonify({'message': 'Agents are not allowed to add programs'}), 403
     program = Program(
@@ -224,18 +559,37 @@ def add_program():
     )
     db.session.add(program)
     db.session.commit()
+    invalidate('programs')
     return jsonify({'message': 'Program added', 'id': program.id}), 201
 
 # Delete Program
 @api_bp.route('/programs/<prog_id>', methods=['DELETE'])
 def delete_program(prog_id):
-    program = Program.query.get(prog_id)
-    if not program:
+    deleted, _, released = delete_programs(db.session, [prog_id])
+    if not deleted:
+        db.session.rollback()
         return jsonify({'message': 'البرنامج غير موجود'}), 404
-    db.session.delete(program)
     db.session.commit()
+    remove_uploads(db.session, released, current_app.root_path)
+    invalidate('programs')
     return jsonify({'message': 'تم حذف البرنامج'}), 200
 
+
+@api_bp.route('/programs', methods=['DELETE'])
+def delete_programs_batch():
+    data, ids, error = _batch_ids()
+    if error:
+        return jsonify({'message': error}), 400
+    user_role, _ = _caller(data)
+    if user_role == 'agent':
+        return jsonify({'message': 'Agents are not allowed to delete programs'}), 403
+    deleted, applications, released = delete_programs(db.session, ids)
+    db.session.commit()
+    remove_uploads(db.session, released, current_app.root_path)
+    invalidate('programs')
+    return jsonify({'message': 'تم حذف البرامج', 'deleted': deleted,
+                    'applicationsDeleted': applications}), 200
+
 # Update Program
 @api_bp.route('/programs/<prog_id>', methods=['PUT'])
 def update_program(prog_id):
@@ -259,6 +613,7 @@ def update_program(prog_id):
         program.description = data['description']
     
     db.session.commit()
+    invalidate('programs')
     return jsonify({'message': 'تم تحديث البرنامج', 'id': program.id}), 200
 
 # Update University
@@ -268,6 +623,11 @@ def update_university(uni_id):
     if not university:
         return jsonify({'message': 'الجامعة غير موجودة'}), 404
     data = request.json
+    if 'logo' in data:
+        try:
+            logo = store_logo(data['logo'], current_app.root_path)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
     university.name = data.get('name', university.name)
     university.website = data.get('website', university.website)
     university.country = data.get('country', university.country)
@@ -275,51 +635,119 @@ def update_university(uni_id):
     university.description = data.get('description', university.description)
     # logo: allow setting to None (remove), a new value, or keep existing
     if 'logo' in data:
-        university.logo = data['logo']  # can be None or a string
+        university.logo = logo  # can be None or a string
     db.session.commit()
-    return jsonify({'message': 'تم تحديث الجامعة', 'id': university.id}), 200
+    invalidate('universities')
+    return jsonify({'message': 'تم تحديث الجامعة', 'id': university.id, 'logo': university.logo}), 200
 
 # Delete University
 @api_bp.route('/universities/<uni_id>', methods=['DELETE'])
 def delete_university(uni_id):
-    university = University.query.get(uni_id)
-    if not university:
+    deleted, _, _, logos, released = delete_universities(db.session, [uni_id])
+    if not deleted:
+        db.session.rollback()
         return jsonify({'message': 'الجامعة غير موجودة'}), 404
-    db.session.delete(university)
     db.session.commit()
+    remove_logos(logos, current_app.root_path)
+    remove_uploads(db.session, released, current_app.root_path)
+    invalidate('universities', 'programs')
     return jsonify({'message': 'تم حذف الجامعة'}), 200
 
 
+@api_bp.route('/universities', methods=['DELETE'])
+def delete_universities_batch():
+    data, ids, error = _batch_ids()
+    if error:
+        return jsonify({'message': error}), 400
+    user_role, _ = _caller(data)
+    if user_role == 'agent':
+        return jsonify({'message': 'Agents are not allowed to delete universities'}), 403
+    deleted, programs, applications, logos, released = delete_universities(db.session, ids)
+    db.session.commit()
+    remove_logos(logos, current_app.root_path)
+    remove_uploads(db.session, released, current_app.root_path)
+    invalidate('universities', 'programs')
+    return jsonify({'message': 'تم حذف الجامعات', 'deleted': deleted, 'programsDeleted': programs,
+                    'applicationsDeleted': applications}), 200
+
+
 @api_bp.route('/applications', methods=['GET'])
 def get_applications():
-    user_role = request.args.get('role')
-    user_id = request.args.get('user_id')
-    if user_role == 'agent' and user_id:
-        applications = Application.query.filter_by(user_id=user_id).all()
+    # Newest first; id breaks ties between rows created in the same instant.
+    sort_cols = [Application.created_at, Application.id]
+    limit, after, error = _page_args(sort_cols)
+    if error:
+        return jsonify({'message': error}), 400
+    try:
+        plan = APPLICATION.plan(APPLICATION.parse(request.args.get('fields')))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    query = plan.select(_applications_query(_scoped_args(request.args)), *sort_cols)
+    next_cursor = None
+    if limit is None:
+        applications = query.order_by(*[c.desc() for c in sort_cols]).all()
     else:
-        applications = Application.query.all()
-    def _file_urls(file_list):
-        if not file_list:
-            return []
-        return [url_for('api.upload_file', filename=f, _external=False) for f in file_list]
-
-    return jsonify([{
-        'id': a.id,
-        'studentId': a.student_id,
-        'programId': a.program_id,
-        'status': a.status,
-        'semester': a.semester,
-        'createdAt': a.created_at,
-        'files': _file_urls(a.files),
-        'userId': a.user_id,
-        'agentPhone': a.user.phone if a.user else None,
-        'agentName': a.user.name if a.user else None,
-        'agentCountryCode': a.user.country_code if a.user else None
-    } for a in applications])
+        applications, next_cursor = _keyset_page(query, sort_cols, limit, after, descending=True)
+    items = plan.dicts(applications)
+    if limit is None:
+        return jsonify(items)
+    return jsonify({'items': items, 'nextCursor': next_cursor})
+
+
+def _applications_query(args):
+    # Agent fields come from the outer join instead of one lazy
+    # Application.user load per row; callers pick the columns.
+    query = db.session.query(Application).outerjoin(User, User.id == Application.user_id)
+    if args.get('role') == 'agent' and args.get('user_id'):
+        query = query.filter(Application.user_id == args['user_id'])
+    elif args.get('agent_id'):
+        query = query.filter(Application.user_id == args['agent_id'])
+    for arg, column in (('status', Application.status),
+                        ('semester', Application.semester),
+                        ('program_id', Application.program_id)):
+        if args.get(arg):
+            query = query.filter(column == args[arg])
+    if args.get('nationality'):
+        query = query.join(Student, Student.id == Application.student_id) \
+            .filter(Student.nationality == args['nationality'])
+    return query
+
+
+_export_student = aliased(Student)
+APPLICATION_EXPORT_COLUMNS = [
+    ('ID', Application.id),
+    ('Created At', Application.created_at),
+    ('Status', Application.status),
+    ('Semester', Application.semester),
+    ('Student ID', Application.student_id),
+    ('First Name', _export_student.first_name),
+    ('Last Name', _export_student.last_name),
+    ('Passport', _export_student.passport_number),
+    ('Nationality', _export_student.nationality),
+    ('Program ID', Application.program_id),
+    ('Program', Program.name),
+    ('Degree', Program.degree),
+    ('University', University.name),
+    ('Agent', User.name),
+    ('Agent Phone', User.phone),
+]
+
+
+@api_bp.route('/applications/export', methods=['GET'])
+def export_applications():
+    fmt = _export_format()
+    if fmt is None:
+        return jsonify({'message': 'format must be csv or xlsx'}), 400
+    # Aliased student: the nationality filter may already join Student
+    query = _applications_query(_scoped_args(request.args)) \
+        .join(_export_student, _export_student.id == Application.student_id) \
+        .join(Program, Program.id == Application.program_id) \
+        .join(University, University.id == Program.university_id) \
+        .order_by(Application.created_at.desc(), Application.id.desc())
+    return export_response('applications', fmt, APPLICATION_EXPORT_COLUMNS, query)
 
 
 import os
-import pandas as pd
 from models import ApplicationMessage
 
 @api_bp.route('/applications', methods=['POST'])
@@ -333,16 +761,9 @@ def add_application():
     program_id = request.form.get('programId')
     status = request.form.get('status')
     semester = request.form.get('semester')
-    user_role = request.form.get('role')
-    user_id = request.form.get('user_id')
-    created_at = datetime.utcnow().isoformat()
-    saved_files = []
-    upload_folder = os.path.join(current_app.root_path, 'uploads')
-    os.makedirs(upload_folder, exist_ok=True)
-    for file in files:
-        filename = f"{uuid.uuid4()}_{file.filename}"
-        file.save(os.path.join(upload_folder, filename))
-        saved_files.append(filename)
+    user_role, user_id = _caller(request.form)
+    created_at = datetime.utcnow()
+    saved_files = [save_upload(db.session, file, current_app.root_path) for file in files]
     application = Application(
         id=_generate_app_id(),
         student_id=student_id,
@@ -360,15 +781,8 @@ def add_application():
 
 
 def _generate_app_id():
-    import random
-    # Try random 6-digit numbers up to a few times to avoid collisions
-    for _ in range(10):
-        n = random.randint(0, 999999)
-        candidate = f"APP{n:06d}"
-        if not Application.query.get(candidate):
-            return candidate
-    # Fallback: use uuid-derived suffix (uppercased)
-    return f"APP{uuid.uuid4().hex[:6].upper()}"
+    # Sequence-backed, block-reserved ids: no lookup queries, no collisions
+    return application_ids.next_id(db.engine)
 
 
 @api_bp.route('/applications_v2', methods=['POST'])
@@ -382,14 +796,8 @@ def add_application_v2():
     program_id = request.form.get('programId')
     status = request.form.get('status')
     semester = request.form.get('semester')
-    created_at = datetime.utcnow().isoformat()
-    saved_files = []
-    upload_folder = os.path.join(current_app.root_path, 'uploads')
-    os.makedirs(upload_folder, exist_ok=True)
-    for file in files:
-        filename = f"{uuid.uuid4()}_{file.filename}"
-        file.save(os.path.join(upload_folder, filename))
-        saved_files.append(filename)
+    created_at = datetime.utcnow()
+    saved_files = [save_upload(db.session, file, current_app.root_path) for file in files]
 
     app_id = _generate_app_id()
     application = Application(
@@ -410,20 +818,56 @@ def add_application_v2():
 # Messages for applications
 @api_bp.route('/applications/<app_id>/messages', methods=['GET'])
 def get_application_messages(app_id):
-    msgs = ApplicationMessage.query.filter_by(application_id=app_id).order_by(ApplicationMessage.created_at).all()
-    return jsonify([{
-        'id': m.id,
-        'applicationId': m.application_id,
-        'sender': m.sender,
-        'message': m.message,
-        'createdAt': m.created_at
-    } for m in msgs])
+    # ?since=<createdAt> returns only newer messages; ?limit=&before=<cursor>
+    # pages backwards from the newest. Pages are returned oldest first.
+    sort_cols = [ApplicationMessage.created_at, ApplicationMessage.id]
+    limit, before, error = _page_args(sort_cols, cursor_param='before')
+    if error:
+        return jsonify({'message': error}), 400
+    since = _parse_timestamp(request.args.get('since'))
+    if request.args.get('since') and since is None:
+        return jsonify({'message': 'invalid since timestamp'}), 400
+    plan = MESSAGE.plan()
+    query = plan.select(ApplicationMessage.query.filter_by(application_id=app_id))
+    if since is not None:
+        query = query.filter(ApplicationMessage.created_at > since)
+    if limit is None or since is not None:
+        return jsonify(plan.dicts(query.order_by(*sort_cols).all()))
+    msgs, next_cursor = _keyset_page(query, sort_cols, limit, before, descending=True)
+    msgs.reverse()
+    return jsonify({'items': plan.dicts(msgs), 'nextCursor': next_cursor})
+
+
+def _notify_staff(exclude_user_id, title, message, link, type_):
+    """Add one notification for every ADMIN/USER account; returns their ids.
+
+    Runs as a single INSERT ... SELECT ... RETURNING inside the caller's
+    transaction, so the cost does not grow with one ORM insert per recipient.
+    """
+    recipients = select(
+        cast(func.gen_random_uuid(), String),
+        User.id,
+        literal(title),
+        literal(message),
+        literal(link),
+        literal(False),
+        literal(datetime.utcnow()),
+        literal(type_)
+    ).where(User.role.in_(['ADMIN', 'USER']))
+    if exclude_user_id:
+        recipients = recipients.where(User.id != exclude_user_id)
+    table = Notification.__table__
+    return db.session.execute(table.insert().from_select(
+        [table.c.id, table.c.user_id, table.c.title, table.c.message,
+         table.c.link, table.c.is_read, table.c.created_at, table.c.type],
+        recipients
+    ).returning(table.c.user_id)).scalars().all()
 
 
 @api_bp.route('/applications/<app_id>/messages', methods=['POST'])
 def post_application_message(app_id):
     data = request.json or {}
-    sender = data.get('sender')
+    sender = g.principal.role if g.principal is not None else data.get('sender')
     message = data.get('message')
     if not sender or not message:
         return jsonify({'message': 'sender and message required'}), 400
@@ -432,13 +876,13 @@ def post_application_message(app_id):
         application_id=app_id,
         sender=sender,
         message=message,
-        created_at=datetime.utcnow().isoformat()
+        created_at=datetime.utcnow()
     )
     db.session.add(msg)
-    db.session.commit()
 
-    # Notification Logic
-    application = Application.query.get(app_id)
+    # Notification Logic (committed together with the message)
+    application = db.session.query(Application.id, Application.user_id).filter_by(id=app_id).first()
+    notified = []
     if application:
         if sender == 'ADMIN':
             # Notify Application Owner (User/Agent)
@@ -449,28 +893,97 @@ def post_application_message(app_id):
                     title="New Message",
                     message=f"Admin: {message[:50]}...",
                     link=f"/applications/{app_id}",
-                    created_at=datetime.utcnow().isoformat(),
+                    created_at=datetime.utcnow(),
                     type="MESSAGE"
                 )
                 db.session.add(n)
+                notified = [application.user_id]
         else:
-            # Notify Admins and Users (managers)
-            admins_and_users = User.query.filter(User.role.in_(['ADMIN', 'USER'])).all()
-            for user in admins_and_users:
-                if user.id == application.user_id: continue # Don't notify self if user is owner
-                n = Notification(
-                    id=str(uuid.uuid4()),
-                    user_id=user.id,
-                    title="New Message",
-                    message=f"App #{app_id}: {message[:50]}...",
-                    link=f"/applications/{app_id}",
-                    created_at=datetime.utcnow().isoformat(),
-                    type="MESSAGE"
-                )
-                db.session.add(n)
-        db.session.commit()
+            # Notify Admins and Users (managers), except the owner
+            notified = _notify_staff(
+                exclude_user_id=application.user_id,
+                title="New Message",
+                message=f"App #{app_id}: {message[:50]}...",
+                link=f"/applications/{app_id}",
+                type_="MESSAGE"
+            )
+    db.session.commit()
+    if notified:
+        notification_hub.publish(notified)
+
+    return jsonify({'message': 'Message added', 'id': msg.id, 'item': MESSAGE.dump(msg)}), 201
+
+
+# Spreadsheet header aliases accepted by the university import
+UNIVERSITY_IMPORT_COLUMNS = {
+    'name': ('name', 'اسم', 'Name'),
+    'website': ('website', 'موقع', 'Website'),
+    'country': ('country', 'دولة', 'Country'),
+    'city': ('city', 'مدينة', 'City'),
+    'description': ('description', 'وصف', 'Description'),
+    'logo': ('logo', 'Logo', 'شعار'),
+}
+IMPORT_CHUNK_SIZE = 1000
+
+
+def _iter_sheet_rows(filepath):
+    """Yield (row_number, {header: value}) from an .xlsx or .csv file.
+
+    Excel files are opened in openpyxl read-only mode and CSV files are read
+    line by line, so memory stays bounded by the chunk size, not the file.
+    Errors while reading the file are raised as ValueError; errors of the
+    caller's own work between rows pass through unchanged.
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    try:
+        if ext == '.csv':
+            import csv
+            with open(filepath, newline='', encoding='utf-8-sig') as fh:
+                reader = csv.reader(fh)
+                header = [h.strip() for h in next(reader, None) or []]
+                for row_number, values in enumerate(reader, start=2):
+                    yield row_number, dict(zip(header, values))
+            return
+        from openpyxl import load_workbook
+        workbook = load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else '' for h in next(rows, None) or []]
+            for row_number, values in enumerate(rows, start=2):
+                yield row_number, dict(zip(header, values))
+        finally:
+            workbook.close()
+    except Exception as e:
+        # Only the reading runs here: the consumer's code between two rows
+        # never raises inside this generator
+        raise ValueError('Failed to read file: ' + str(e)) from e
+
 
-    return jsonify({'message': 'Message added', 'id': msg.id}), 201
+def _cell(row, field):
+    for alias in UNIVERSITY_IMPORT_COLUMNS[field]:
+        value = row.get(alias)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return ''
+
+
+def _flush_university_chunk(chunk, seen_names, added, rejected):
+    """Dedupe one chunk against the DB with a single IN query and bulk insert it."""
+    names = {u['name'] for _, u in chunk}
+    existing = {n for (n,) in db.session.query(University.name).filter(University.name.in_(names))}
+    rows = []
+    for row_number, uni in chunk:
+        if uni['name'] in existing:
+            rejected.append({'row': row_number, 'name': uni['name'], 'reason': 'already exists'})
+            continue
+        if uni['name'] in seen_names:
+            rejected.append({'row': row_number, 'name': uni['name'], 'reason': 'duplicate in file'})
+            continue
+        seen_names.add(uni['name'])
+        rows.append(uni)
+    if rows:
+        db.session.execute(University.__table__.insert(), rows)
+        added.extend(rows)
 
 
 @api_bp.route('/universities/import', methods=['POST'])
@@ -480,62 +993,141 @@ def import_universities():
     file = request.files['file']
     if file.filename == '':
         return jsonify({'message': 'No file selected'}), 400
-    upload_folder = os.path.join(current_app.root_path, 'uploads')
-    os.makedirs(upload_folder, exist_ok=True)
-    filename = f"{uuid.uuid4()}_{secure_filename(file.filename)}"
-    filepath = os.path.join(upload_folder, filename)
-    file.save(filepath)
+    ext = os.path.splitext(file.filename)[1].lower()
+    if ext not in ('.xlsx', '.xlsm', '.csv'):
+        return jsonify({'message': 'Unsupported file type, use .xlsx or .csv'}), 400
+    if request.args.get('async') == '1':
+        _, user_id = _caller(request.form)
+        job = enqueue('import_universities', user_id=user_id, upload=file)
+        return _job_accepted(job)
+    # The sheet is only needed while importing; keep the extension for the reader
+    fd, filepath = tempfile.mkstemp(suffix=ext)
+    os.close(fd)
     try:
-        df = pd.read_excel(filepath)
-    except Exception as e:
-        return jsonify({'message': 'Failed to read Excel: ' + str(e)}), 400
+        file.save(filepath)
+        body = _import_universities_file(filepath)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    finally:
+        os.remove(filepath)
+    return jsonify(body), 201
+
 
+def _import_universities_file(filepath, progress=None):
+    """Import a university sheet in chunks; returns the response body.
+
+    Raises ValueError when the file cannot be read; database errors are
+    raised as they are.
+    """
     added = []
-    for _, row in df.iterrows():
-        name = str(row.get('name') or row.get('اسم') or row.get('Name') or '').strip()
-        website = str(row.get('website') or row.get('موقع') or row.get('Website') or '').strip()
-        country = str(row.get('country') or row.get('دولة') or row.get('Country') or 'Turkey').strip()
-        city = str(row.get('city') or row.get('مدينة') or row.get('City') or '').strip()
-        description = str(row.get('description') or row.get('وصف') or row.get('Description') or '').strip()
-        # Logo: support columns named logo / Logo / شعار — expected to be a URL (http/https)
-        logo_raw = str(row.get('logo') or row.get('Logo') or row.get('شعار') or '').strip()
-        # Accept only valid-looking URLs; ignore empty or 'nan' values
-        logo = logo_raw if logo_raw and logo_raw.lower() != 'nan' and logo_raw.startswith('http') else None
-        if not name:
-            continue
-        if University.query.filter_by(name=name).first():
-            continue
-        uni = University(
-            id=str(uuid.uuid4()),
-            name=name,
-            website=website or '',
-            country=country,
-            city=city or '',
-            description=description or '',
-            logo=logo
-        )
-        db.session.add(uni)
-        added.append({
-            'id': uni.id,
-            'name': uni.name,
-            'website': uni.website,
-            'country': uni.country,
-            'city': uni.city,
-            'description': uni.description,
-            'logo': uni.logo
-        })
+    rejected = []
+    seen_names = set()
+    chunk = []
+    try:
+        for row_number, row in _iter_sheet_rows(filepath):
+            name = _cell(row, 'name')
+            if not name:
+                if any(v is not None and str(v).strip() for v in row.values()):
+                    rejected.append({'row': row_number, 'name': '', 'reason': 'missing name'})
+                continue
+            # Logo is expected to be a URL (http/https); anything else is ignored
+            logo = _cell(row, 'logo')
+            chunk.append((row_number, {
+                'id': str(uuid.uuid4()),
+                'name': name,
+                'website': _cell(row, 'website'),
+                'country': _cell(row, 'country') or 'Turkey',
+                'city': _cell(row, 'city'),
+                'description': _cell(row, 'description'),
+                'logo': logo if logo.startswith('http') else None
+            }))
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                _flush_university_chunk(chunk, seen_names, added, rejected)
+                chunk = []
+                if progress:
+                    progress(row_number - 1)
+        if chunk:
+            _flush_university_chunk(chunk, seen_names, added, rejected)
+    except Exception:
+        db.session.rollback()
+        raise
 
     db.session.commit()
-    return jsonify({'message': f'Imported {len(added)} universities', 'added': added}), 201
+    if added:
+        invalidate('universities')
+    return {
+        'message': f'Imported {len(added)} universities',
+        'added': added,
+        'rejected': rejected
+    }
+
+
+@job_handler('import_universities')
+def _import_universities_job(job, path, filename):
+    try:
+        return _import_universities_file(path, job.progress)
+    except ValueError as e:
+        raise PermanentJobError(str(e))
+
+
+# Background jobs (see jobs.py): long routes answer 202 with a job to poll
+def _job_accepted(job):
+    status_url = url_for('api.get_job', job_id=job.id)
+    response = jsonify({'message': 'Accepted', 'jobId': job.id, 'statusUrl': status_url})
+    response.headers['Location'] = status_url
+    return response, 202
+
+
+def _job_dict(job):
+    return {
+        'id': job.id,
+        'type': job.type,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'attempts': job.attempts,
+        'maxAttempts': job.max_attempts,
+        'result': job.result,
+        'error': job.error,
+        'createdAt': _iso(job.created_at),
+        'startedAt': _iso(job.started_at),
+        'finishedAt': _iso(job.finished_at)
+    }
+
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = db.session.get(Job, job_id)
+    principal = g.principal
+    if job is None or (principal is not None and principal.role != 'ADMIN' and job.user_id != principal.id):
+        return jsonify({'message': 'Job not found'}), 404
+    return jsonify(_job_dict(job))
 
 
 # Serve uploaded files
 @api_bp.route('/uploads/<path:filename>', methods=['GET'])
 def upload_file(filename):
+    parsed = parse_entry(filename)
+    if parsed:
+        digest, name = parsed
+        return send_from_directory(blobs_folder(current_app.root_path), digest,
+                                   as_attachment=False, download_name=name)
     upload_folder = os.path.join(current_app.root_path, 'uploads')
     return send_from_directory(upload_folder, filename, as_attachment=False)
 
 
+# Serve stored university logos; names are content hashes so they never change
+@api_bp.route('/logos/<filename>', methods=['GET'])
+def logo_file(filename):
+    folder = logo_folder(current_app.root_path)
+    if filename.startswith('thumb_') and not os.path.exists(os.path.join(folder, secure_filename(filename))):
+        filename = filename[len('thumb_'):]
+    response = send_from_directory(folder, filename, max_age=LOGO_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
 # List files for an application / upload additional files
 @api_bp.route('/applications/<app_id>/files', methods=['GET', 'POST'])
 def application_files(app_id):
@@ -543,14 +1135,11 @@ def application_files(app_id):
     if not application:
         return jsonify({'message': 'Application not found'}), 404
 
-    upload_folder = os.path.join(current_app.root_path, 'uploads')
-    os.makedirs(upload_folder, exist_ok=True)
-
     if request.method == 'GET':
         files = application.files or []
         files_info = [
             {
-                'name': f.split('_', 1)[1] if '_' in f else f,
+                'name': display_name(f),
                 'filename': f,
                 'url': url_for('api.upload_file', filename=f, _external=False)
             } for f in files
@@ -561,17 +1150,13 @@ def application_files(app_id):
     if 'files' not in request.files:
         return jsonify({'message': 'No files provided'}), 400
     files = request.files.getlist('files')
-    saved = []
-    for file in files:
-        filename = f"{uuid.uuid4()}_{secure_filename(file.filename)}"
-        file.save(os.path.join(upload_folder, filename))
-        saved.append(filename)
+    saved = [save_upload(db.session, file, current_app.root_path) for file in files]
 
     application.files = (application.files or []) + saved
     db.session.commit()
     files_info = [
         {
-            'name': f.split('_', 1)[1] if '_' in f else f,
+            'name': display_name(f),
             'filename': f,
             'url': url_for('api.upload_file', filename=f, _external=False)
         } for f in application.files
@@ -592,15 +1177,10 @@ def delete_application_file(app_id, filename):
     # SQLAlchemy requires assigning a new reference or mutating the mutable list properly if using JSON
     # It's safer to assign a new list of the remaining items.
     application.files = list(current_files)
+    # The stored blob is removed only when no other entry references it
+    released = release_upload(db.session, filename)
     db.session.commit()
-
-    upload_folder = os.path.join(current_app.root_path, 'uploads')
-    file_path = os.path.join(upload_folder, filename)
-    if os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-        except Exception as e:
-            pass # ignore if file already missing or locked
+    remove_uploads(db.session, released, current_app.root_path)
 
     return jsonify({'message': 'File deleted successfully'}), 200
 
@@ -629,36 +1209,345 @@ def update_application_status(app_id):
             title="Application Status Update",
             message=f"Your application #{application.id} status changed to {new_status}",
             link=f"/applications/{application.id}",
-            created_at=datetime.utcnow().isoformat(),
+            created_at=datetime.utcnow(),
             type="STATUS"
         )
         db.session.add(notification)
         db.session.commit()
+        notification_hub.publish([notify_user_id])
         
     return jsonify({'message': 'Status updated', 'status': application.status}), 200
 
+# Everything the SPA needs on startup in one (compressed) response
+BOOTSTRAP_SCHEMAS = {
+    'universities': UNIVERSITY,
+    'programs': PROGRAM,
+    'students': STUDENT,
+    'applications': APPLICATION,
+    'users': USER,
+}
+
+
+@api_bp.route('/bootstrap', methods=['GET'])
+def get_bootstrap():
+    args = _scoped_args(request.args)
+    collections = ['universities', 'programs', 'students', 'applications']
+    if _is_admin():
+        collections.append('users')
+    selected = parse_fields(request.args.get('fields'), collections)
+    plans = {}
+    for name, keys in selected.items():
+        schema = BOOTSTRAP_SCHEMAS[name]
+        try:
+            plans[name] = schema.plan(None if keys is None else schema.parse(','.join(keys)))
+        except ValueError as e:
+            return jsonify({'message': f'{e} in {name}'}), 400
+
+    payload = {}
+    for name, plan in plans.items():
+        if name == 'universities':
+            rows = plan.select(University.query).order_by(University.id)
+        elif name == 'programs':
+            rows = plan.select(Program.query).order_by(Program.id)
+        elif name == 'students':
+            rows = plan.select(_students_query(args)).order_by(Student.id)
+        elif name == 'applications':
+            rows = plan.select(_applications_query(args)) \
+                .order_by(Application.created_at.desc(), Application.id.desc())
+        else:
+            rows = plan.select(User.query).order_by(User.id)
+        payload[name] = plan.dicts(rows)
+
+    try:
+        return encode(payload, columnar=request.args.get('format') == 'columnar')
+    except LookupError as e:
+        return jsonify({'message': str(e)}), 406
+
+
+# Search across students, programs and universities.
+# Full-text prefix matching uses the GIN indexes declared in models.py; when
+# the pg_trgm extension is installed, typo-tolerant matches fill up the rest.
+SEARCH_LIMIT = 10
+_TSQUERY_SPECIAL = re.compile(r"[\s&|!():*<>'\\]+")
+_SEARCH_FOLD = str.maketrans(SEARCH_FOLD_FROM, SEARCH_FOLD_TO)
+_trigram_available = None
+
+
+def _has_trigram():
+    global _trigram_available
+    if _trigram_available is None:
+        _trigram_available = bool(db.session.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar())
+    return _trigram_available
+
+
+def _search(model, columns, q, tsquery, limit, extra_filter=()):
+    vector = search_vector(*columns)
+    query_ts = func.to_tsquery(literal('simple', String), tsquery)
+    rank = func.ts_rank(vector, query_ts).label('score')
+    rows = db.session.query(model, rank).filter(vector.op('@@')(query_ts), *extra_filter) \
+        .order_by(rank.desc(), model.id).limit(limit).all()
+    if len(rows) < limit and _has_trigram():
+        document = search_document(*columns)
+        similarity = func.word_similarity(q, document).label('score')
+        found = [obj.id for obj, _ in rows]
+        rows += db.session.query(model, similarity) \
+            .filter(literal(q, String).op('<%')(document), ~model.id.in_(found), *extra_filter) \
+            .order_by(similarity.desc(), model.id).limit(limit - len(rows)).all()
+    return rows
+
+
+@api_bp.route('/search', methods=['GET'])
+def search():
+    q = (request.args.get('q') or '').strip().lower().translate(_SEARCH_FOLD)
+    tokens = [t for t in _TSQUERY_SPECIAL.split(q) if t]
+    if not tokens:
+        return jsonify({'message': 'q is required'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_LIMIT)), 1), 50)
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+    tsquery = ' & '.join(f"{t}:*" for t in tokens)
+    student_filter = []
+    user_role, user_id = _caller(request.args)
+    if user_role == 'agent' and user_id:
+        student_filter.append(Student.user_id == user_id)
+
+    students = _search(Student, STUDENT_SEARCH_COLUMNS, q, tsquery, limit, student_filter)
+    programs = _search(Program, PROGRAM_SEARCH_COLUMNS, q, tsquery, limit)
+    universities = _search(University, UNIVERSITY_SEARCH_COLUMNS, q, tsquery, limit)
+    return jsonify({
+        'students': [{
+            'id': st.id,
+            'firstName': st.first_name,
+            'lastName': st.last_name,
+            'passportNumber': st.passport_number,
+            'email': st.email,
+            'nationality': st.nationality,
+            'score': round(score, 4)
+        } for st, score in students],
+        'programs': [{
+            'id': p.id,
+            'universityId': p.university_id,
+            'name': p.name,
+            'degree': p.degree,
+            'language': p.language,
+            'score': round(score, 4)
+        } for p, score in programs],
+        'universities': [{
+            'id': u.id,
+            'name': u.name,
+            'city': getattr(u, 'city', ''),
+            'country': u.country,
+            'score': round(score, 4)
+        } for u, score in universities]
+    })
+
+
+# Dashboard aggregates: counts come from GROUP BY, names from joins
+@api_bp.route('/stats', methods=['GET'])
+def get_stats():
+    user_role, user_id = _caller(request.args)
+    try:
+        limit = min(max(int(request.args.get('limit', 5)), 0), 50)
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+    agent_scope = user_role == 'agent' and user_id
+    app_filter = [Application.user_id == user_id] if agent_scope else []
+    student_filter = [Student.user_id == user_id] if agent_scope else []
+
+    totals = db.session.query(
+        select(func.count()).select_from(Student).where(*student_filter).scalar_subquery(),
+        select(func.count()).select_from(Application).where(*app_filter).scalar_subquery(),
+        select(func.count()).select_from(University).scalar_subquery(),
+        select(func.count()).select_from(Program).scalar_subquery()
+    ).one()
+
+    def _grouped(column):
+        rows = db.session.query(column, func.count()).filter(*app_filter).group_by(column).all()
+        return {key: count for key, count in rows}
+
+    by_agent = db.session.query(Application.user_id, User.name, func.count()) \
+        .outerjoin(User, User.id == Application.user_id) \
+        .filter(*app_filter) \
+        .group_by(Application.user_id, User.name).all()
+    by_university = db.session.query(University.id, University.name, func.count()) \
+        .select_from(Application) \
+        .join(Program, Program.id == Application.program_id) \
+        .join(University, University.id == Program.university_id) \
+        .filter(*app_filter) \
+        .group_by(University.id, University.name).all()
+    recent = db.session.query(
+        Application.id,
+        Application.student_id,
+        Application.program_id,
+        Application.status,
+        Application.semester,
+        Application.created_at,
+        Student.first_name,
+        Student.last_name,
+        Program.name.label('program_name'),
+        University.name.label('university_name'),
+        User.name.label('agent_name')
+    ).outerjoin(Student, Student.id == Application.student_id) \
+        .outerjoin(Program, Program.id == Application.program_id) \
+        .outerjoin(University, University.id == Program.university_id) \
+        .outerjoin(User, User.id == Application.user_id) \
+        .filter(*app_filter) \
+        .order_by(Application.created_at.desc(), Application.id.desc()) \
+        .limit(limit).all()
+
+    return jsonify({
+        'totals': {
+            'students': totals[0],
+            'applications': totals[1],
+            'universities': totals[2],
+            'programs': totals[3]
+        },
+        'byStatus': _grouped(Application.status),
+        'bySemester': _grouped(Application.semester),
+        'byAgent': [{'userId': uid, 'name': name, 'count': count} for uid, name, count in by_agent],
+        'byUniversity': [{'universityId': uid, 'name': name, 'count': count} for uid, name, count in by_university],
+        'recentApplications': [{
+            'id': a.id,
+            'studentId': a.student_id,
+            'studentName': f"{a.first_name} {a.last_name}" if a.first_name else None,
+            'programId': a.program_id,
+            'programName': a.program_name,
+            'universityName': a.university_name,
+            'agentName': a.agent_name,
+            'status': a.status,
+            'semester': a.semester,
+            'createdAt': _iso(a.created_at)
+        } for a in recent]
+    })
+
+
 # Notifications
+def _notifications_since(user_id, since):
+    """Notification dicts newer than since, newest first."""
+    plan = NOTIFICATION.plan()
+    query = plan.select(Notification.query.filter_by(user_id=user_id))
+    if since:
+        query = query.filter(Notification.created_at > since)
+    return plan.dicts(query.order_by(Notification.created_at.desc()))
+
+
+def _unread_count(user_id):
+    count = notification_hub.cached_unread(user_id)
+    if count is None:
+        version = notification_hub.version(user_id)
+        count = Notification.query.filter_by(user_id=user_id, is_read=False).count()
+        notification_hub.store_unread(user_id, version, count)
+    return count
+
+
 @api_bp.route('/notifications', methods=['GET'])
 def get_notifications():
-    user_id = request.args.get('user_id')
+    _, user_id = _caller(request.args)
+    if not user_id:
+        return jsonify({'message': 'User ID required'}), 400
+    # ?since=<createdAt> returns only notifications newer than the cursor
+    since = _parse_timestamp(request.args.get('since'))
+    if request.args.get('since') and since is None:
+        return jsonify({'message': 'invalid since timestamp'}), 400
+    return jsonify(_notifications_since(user_id, since))
+
+
+@api_bp.route('/notifications/unread-count', methods=['GET'])
+def get_unread_count():
+    _, user_id = _caller(request.args)
+    if not user_id:
+        return jsonify({'message': 'User ID required'}), 400
+    return jsonify({'unreadCount': _unread_count(user_id)})
+
+
+# Server-Sent Events used as a bounded long-poll. Workers are sync threads,
+# so a connection never waits longer than STREAM_WAIT_SECONDS: it sends at
+# most one event and ends, and EventSource reconnects with Last-Event-ID.
+# At most STREAM_SLOTS connections per process wait at once; when they are
+# all taken a connection only checks for new rows and asks the client to
+# come back after STREAM_BUSY_RETRY_SECONDS, so the remaining threads stay
+# free for ordinary requests.
+STREAM_WAIT_SECONDS = float(os.getenv('STREAM_WAIT_SECONDS', 20))
+STREAM_SLOTS = int(os.getenv('STREAM_SLOTS', max(1, int(os.getenv('WEB_THREADS', 8)) // 2)))
+STREAM_BUSY_RETRY_SECONDS = 15
+_stream_slots = threading.BoundedSemaphore(STREAM_SLOTS)
+
+
+@api_bp.route('/notifications/stream', methods=['GET'])
+def stream_notifications():
+    _, user_id = _caller(request.args)
     if not user_id:
         return jsonify({'message': 'User ID required'}), 400
-    notifications = Notification.query.filter_by(user_id=user_id).order_by(Notification.created_at.desc()).all()
-    return jsonify([{
-        'id': n.id,
-        'title': n.title,
-        'message': n.message,
-        'link': n.link,
-        'isRead': n.is_read,
-        'createdAt': n.created_at,
-        'type': n.type
-    } for n in notifications])
+    # EventSource resends the last event id when it reconnects
+    since = _parse_timestamp(request.headers.get('Last-Event-ID') or request.args.get('since'))
+
+    # A first connection starts from now; the client loads older rows itself
+    catch_up = since is not None
+    since = since or datetime.utcnow()
+
+    def _fresh():
+        try:
+            return _notifications_since(user_id, since), _unread_count(user_id)
+        finally:
+            # Do not hold a pooled connection while waiting
+            db.session.remove()
+
+    def _events():
+        fresh = None
+        waiting = _stream_slots.acquire(blocking=False)
+        try:
+            retry = 1 if waiting else STREAM_BUSY_RETRY_SECONDS
+            yield f'retry: {retry * 1000}\n\n'
+            version = notification_hub.version(user_id)
+            if catch_up:
+                fresh, unread = _fresh()
+            if not fresh and waiting and \
+                    notification_hub.wait(user_id, version, STREAM_WAIT_SECONDS) is not None:
+                fresh, unread = _fresh()
+        finally:
+            if waiting:
+                _stream_slots.release()
+        if fresh:
+            payload = {'notifications': fresh, 'unreadCount': unread}
+            yield f"id: {fresh[0]['createdAt']}\nevent: notifications\ndata: {json.dumps(payload)}\n\n"
+        else:
+            # An id-only event still sets the Last-Event-ID of the reconnect
+            yield f"id: {_iso(since)}\n\n"
+
+    return Response(stream_with_context(_events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# Mark many (body {"ids": [...]}) or, without ids, all of the caller's
+# notifications as read with a single UPDATE
+@api_bp.route('/notifications/read', methods=['PUT'])
+def mark_notifications_read():
+    data = request.get_json(silent=True) or {}
+    _, user_id = _caller(data)
+    if not user_id:
+        return jsonify({'message': 'User ID required'}), 400
+    ids = data.get('ids')
+    # Omitted ids marks all of the user's notifications
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, str) for i in ids)):
+        return jsonify({'message': 'ids must be a list of strings'}), 400
+    query = Notification.query.filter(Notification.user_id == user_id, Notification.is_read.is_(False))
+    if ids is not None:
+        query = query.filter(Notification.id.in_(ids))
+    updated = query.update({Notification.is_read: True}, synchronize_session=False)
+    db.session.commit()
+    if updated:
+        notification_hub.publish([user_id])
+    return jsonify({'message': 'Marked as read', 'updated': updated}), 200
+
 
 @api_bp.route('/notifications/<n_id>/read', methods=['PUT'])
 def mark_notification_read(n_id):
     notification = Notification.query.get(n_id)
-    if not notification:
+    if not notification or (g.principal is not None and notification.user_id != g.principal.id):
         return jsonify({'message': 'Notification not found'}), 404
     notification.is_read = True
     db.session.commit()
+    notification_hub.publish([notification.user_id])
     return jsonify({'message': 'Marked as read'}), 200
@@ -1,8 +1,10 @@
 from app import create_app, db
 from models import User
+from migrations import upgrade
+from metrics import reset as reset_metrics
+from jobs import runner as job_runner
+import os
 from flask import Blueprint, request, jsonify
-from sqlalchemy import inspect, text
-from sqlalchemy.orm import load_only
 
 app = create_app()
 api_bp = Blueprint('api', __name__)
@@ -24,61 +26,11 @@ def get_users():
     } for user in users])
 
 if __name__ == '__main__':
+    reset_metrics(app.instance_path)
     with app.app_context():
-        db.create_all()
-        # Ensure new columns exist in DB (simple migration)
-        inspector = inspect(db.engine)
-        try:
-            cols = [c['name'] for c in inspector.get_columns('users')]
-        except Exception:
-            cols = []
-        with db.engine.connect() as conn:
-            if 'phone' not in cols:
-                conn.execute(text('ALTER TABLE users ADD COLUMN phone VARCHAR'))
-            if 'country_code' not in cols:
-                conn.execute(text('ALTER TABLE users ADD COLUMN country_code VARCHAR'))
-            # Add logo column to universities if not exists
-            try:
-                uni_cols = [c['name'] for c in inspector.get_columns('universities')]
-            except Exception:
-                uni_cols = []
-            if 'logo' not in uni_cols:
-                try:
-                    conn.execute(text('ALTER TABLE universities ADD COLUMN logo TEXT'))
-                except Exception:
-                    pass
-            if 'city' not in uni_cols:
-                try:
-                    conn.execute(text("ALTER TABLE universities ADD COLUMN city VARCHAR NOT NULL DEFAULT ''"))
-                except Exception:
-                    pass
-            conn.commit()
-        # إضافة أدمن افتراضي إذا لم يوجد
-        try:
-            exists = User.query.options(load_only(User.email)).filter_by(email='admin@admin.com').first()
-        except Exception as e:
-            # If columns missing, try to add them then retry a minimal select
-            print('User query failed, attempting to ensure columns exist:', e)
-            with db.engine.connect() as conn:
-                try:
-                    conn.execute(text('ALTER TABLE users ADD COLUMN IF NOT EXISTS phone VARCHAR'))
-                except Exception:
-                    pass
-                try:
-                    conn.execute(text('ALTER TABLE users ADD COLUMN IF NOT EXISTS country_code VARCHAR'))
-                except Exception:
-                    pass
-            db.session.commit()
-            exists = User.query.options(load_only(User.email)).filter_by(email='admin@admin.com').first()
-
-        if not exists:
-            admin = User(
-                id='1',
-                name='admin',
-                email='admin@admin.com',
-                password='admin',  # يفضل لاحقاً تشفيرها
-                role='ADMIN'
-            )
-            db.session.add(admin)
-            db.session.commit()
+        # One SELECT when the schema is current; see migrations.py
+        upgrade(db.engine)
+    # With the reloader only the child process serves requests and runs jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        job_runner.start(app)
     app.run(debug=True)
@@ -0,0 +1,219 @@
+"""Declared response schemas read straight from row tuples.
+
+Each model's JSON shape is declared once as a ``Schema`` of ``Field(key,
+column)``. A request asks the schema for a ``Plan`` covering the keys it
+wants (all of them, or those named in ``?fields=``); the plan narrows the
+query to just those columns with ``with_entities`` so rows come back as
+plain tuples instead of ORM objects (no identity map, no attribute
+instrumentation), and turns each row into a dict with one ``zip``. Plans are
+compiled once per distinct key set and cached on the schema.
+
+Fields whose value needs work (timestamps, file URLs, logo thumbnails) carry
+a converter that runs on the column value only when the field is selected;
+timestamps use ``datetime.isoformat`` directly since those columns are NOT
+NULL.
+"""
+import threading
+from datetime import datetime
+from operator import itemgetter
+
+from flask import url_for
+from sqlalchemy import type_coerce
+from sqlalchemy.types import NullType
+
+from logos import thumbnail_url
+from models import (User, Student, University, Program, Application, ApplicationMessage,
+                    Notification)
+
+
+def _file_urls(file_list):
+    if not file_list:
+        return []
+    return [url_for('api.upload_file', filename=f, _external=False) for f in file_list]
+
+
+class Field:
+    __slots__ = ('key', 'column', 'convert')
+
+    def __init__(self, key, column, convert=None):
+        self.key = key
+        self.column = column
+        self.convert = convert
+
+
+class Plan:
+    """Columns to select and how to turn the resulting rows into dicts."""
+
+    def __init__(self, fields):
+        self.keys = tuple(f.key for f in fields)
+        self.columns = []
+        positions = []
+        for f in fields:
+            # Two keys may share a column (logo / logoThumb): select it once
+            index = next((i for i, c in enumerate(self.columns) if c is f.column), None)
+            if index is None:
+                index = len(self.columns)
+                self.columns.append(f.column)
+            positions.append(index)
+        if len(positions) == 1:
+            self._values = lambda row, i=positions[0]: (row[i],)
+        elif positions:
+            self._values = itemgetter(*positions)
+        else:
+            self._values = lambda row: ()
+        self._converters = [(f.key, f.convert) for f in fields if f.convert]
+
+    def select(self, query, *extra):
+        """Narrow query to the plan's columns plus extra (e.g. keyset sort) columns."""
+        columns = list(self.columns)
+        columns += [c for c in extra if not any(c is s for s in columns)]
+        return query.with_entities(*columns)
+
+    def dicts(self, rows):
+        keys, values = self.keys, self._values
+        if not self._converters:
+            return [dict(zip(keys, values(row))) for row in rows]
+        converters = self._converters
+        items = []
+        for row in rows:
+            item = dict(zip(keys, values(row)))
+            for key, convert in converters:
+                item[key] = convert(item[key])
+            items.append(item)
+        return items
+
+
+class Schema:
+    def __init__(self, *fields):
+        self.fields = fields
+        self.keys = frozenset(f.key for f in fields)
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    def parse(self, value):
+        """Key set for a ?fields=a,b value; None (all keys) when empty.
+
+        Raises ValueError naming the first unknown key.
+        """
+        if not value:
+            return None
+        keys = {k.strip() for k in value.split(',') if k.strip()}
+        if not keys:
+            return None
+        unknown = sorted(keys - self.keys)
+        if unknown:
+            raise ValueError(f'unknown field {unknown[0]}')
+        return keys
+
+    def plan(self, keys=None):
+        """Compiled plan for keys (None for all); unknown keys are ignored.
+
+        Raises ValueError when no known key is left, since a query cannot
+        select zero columns.
+        """
+        cache_key = None if keys is None else frozenset(keys) & self.keys
+        plan = self._plans.get(cache_key)
+        if plan is None:
+            if cache_key is not None and not cache_key:
+                raise ValueError('no fields selected')
+            fields = [f for f in self.fields if cache_key is None or f.key in cache_key]
+            plan = Plan(fields)
+            with self._lock:
+                self._plans[cache_key] = plan
+        return plan
+
+    def dump(self, obj):
+        """Dict for one ORM object, e.g. a row that was just created."""
+        return {f.key: f.convert(getattr(obj, f.column.key)) if f.convert else getattr(obj, f.column.key)
+                for f in self.fields}
+
+
+# psycopg2 already returns text[] as a list; skip SQLAlchemy's per-element
+# ARRAY processing, which costs more than the rest of the row
+_application_files = type_coerce(Application.files, NullType()).label('files')
+_agent_phone = User.phone.label('agent_phone')
+_agent_name = User.name.label('agent_name')
+_agent_country_code = User.country_code.label('agent_country_code')
+
+USER = Schema(
+    Field('id', User.id),
+    Field('name', User.name),
+    Field('email', User.email),
+    Field('role', User.role),
+    Field('phone', User.phone),
+    Field('countryCode', User.country_code),
+)
+
+STUDENT = Schema(
+    Field('id', Student.id),
+    Field('firstName', Student.first_name),
+    Field('lastName', Student.last_name),
+    Field('passportNumber', Student.passport_number),
+    Field('fatherName', Student.father_name),
+    Field('motherName', Student.mother_name),
+    Field('gender', Student.gender),
+    Field('phone', Student.phone),
+    Field('email', Student.email),
+    Field('nationality', Student.nationality),
+    Field('degreeTarget', Student.degree_target),
+    Field('dob', Student.dob),
+    Field('residenceCountry', Student.residence_country),
+    Field('userId', Student.user_id),
+)
+
+UNIVERSITY = Schema(
+    Field('id', University.id),
+    Field('name', University.name),
+    Field('website', University.website),
+    Field('country', University.country),
+    Field('city', University.city),
+    Field('description', University.description),
+    Field('logo', University.logo),
+    Field('logoThumb', University.logo, thumbnail_url),
+)
+
+PROGRAM = Schema(
+    Field('id', Program.id),
+    Field('universityId', Program.university_id),
+    Field('name', Program.name),
+    Field('degree', Program.degree),
+    Field('language', Program.language),
+    Field('years', Program.years),
+    Field('deadline', Program.deadline),
+    Field('fee', Program.fee),
+    Field('currency', Program.currency),
+    Field('description', Program.description),
+)
+
+# Agent fields come from an outer join on users (see _applications_query)
+APPLICATION = Schema(
+    Field('id', Application.id),
+    Field('studentId', Application.student_id),
+    Field('programId', Application.program_id),
+    Field('status', Application.status),
+    Field('semester', Application.semester),
+    Field('createdAt', Application.created_at, datetime.isoformat),
+    Field('files', _application_files, _file_urls),
+    Field('userId', Application.user_id),
+    Field('agentPhone', _agent_phone),
+    Field('agentName', _agent_name),
+    Field('agentCountryCode', _agent_country_code),
+)
+
+MESSAGE = Schema(
+    Field('id', ApplicationMessage.id),
+    Field('applicationId', ApplicationMessage.application_id),
+    Field('sender', ApplicationMessage.sender),
+    Field('message', ApplicationMessage.message),
+    Field('createdAt', ApplicationMessage.created_at, datetime.isoformat),
+)
+
+NOTIFICATION = Schema(
+    Field('id', Notification.id),
+    Field('title', Notification.title),
+    Field('message', Notification.message),
+    Field('link', Notification.link),
+    Field('isRead', Notification.is_read),
+    Field('createdAt', Notification.created_at, datetime.isoformat),
+    Field('type', Notification.type),
+)
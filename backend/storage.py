@@ -0,0 +1,170 @@
+"""Content-addressed, reference-counted storage for application uploads.
+
+Uploads are streamed to a temporary file while being hashed and kept once
+under ``uploads/blobs/<sha256>``. ``Application.files`` stores entries of the
+form ``<sha256>_<original name>`` and ``upload_blobs.ref_count`` tracks how
+many entries point at each blob, so a file is only removed from disk when its
+last reference goes away. Entries written before this change
+(``<uuid>_<name>``) still live directly in ``uploads/`` and keep working.
+
+Releasing references only changes rows; the files are deleted by
+``remove_uploads`` once that transaction has committed, so a rollback never
+leaves rows pointing at missing files. ``save_upload`` and
+``remove_uploads`` hold the blob's advisory lock while they look at its
+file, so a blob that gains a new reference in between is kept.
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from sqlalchemy import text
+
+CHUNK_SIZE = 64 * 1024
+_BLOB_ENTRY = re.compile(r'^([0-9a-f]{64})_(.+)$')
+
+
+def uploads_folder(root_path):
+    return os.path.join(root_path, 'uploads')
+
+
+def blobs_folder(root_path):
+    return os.path.join(uploads_folder(root_path), 'blobs')
+
+
+def blob_path(root_path, digest):
+    return os.path.join(blobs_folder(root_path), digest)
+
+
+def parse_entry(entry):
+    """Return (digest, name) for a blob entry, or None for a legacy file."""
+    match = _BLOB_ENTRY.match(entry)
+    return (match.group(1), match.group(2)) if match else None
+
+
+def display_name(entry):
+    return entry.split('_', 1)[1] if '_' in entry else entry
+
+
+def _blob_lock(digest):
+    # pg_advisory_xact_lock takes a bigint; 60 bits of the digest are plenty
+    return int(digest[:15], 16)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # ignore if file already missing or locked
+
+
+def _clean_name(filename):
+    # Keep non-Latin names readable; only strip any client-side directory part
+    name = os.path.basename((filename or '').replace('\\', '/')).strip()
+    return name or 'file'
+
+
+def save_upload(session, file, root_path):
+    """Store an uploaded FileStorage and take a reference to its blob.
+
+    The reference is added to session's transaction; the caller commits it
+    together with the row that lists the returned entry.
+    """
+    folder = blobs_folder(root_path)
+    os.makedirs(folder, exist_ok=True)
+    tmp_path = os.path.join(folder, f".{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        digest = digest.hexdigest()
+        # Held until the caller commits: remove_uploads cannot delete the
+        # file between our check below and the new reference becoming visible
+        session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': _blob_lock(digest)})
+        session.execute(text(
+            "INSERT INTO upload_blobs (hash, size, ref_count) VALUES (:hash, :size, 1) "
+            "ON CONFLICT (hash) DO UPDATE SET ref_count = upload_blobs.ref_count + 1"
+        ), {'hash': digest, 'size': size})
+        path = blob_path(root_path, digest)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return f"{digest}_{_clean_name(file.filename)}"
+
+
+def release_upload(session, entry):
+    """Drop one reference to entry; returns what to pass to remove_uploads.
+
+    Must run inside the transaction that removes entry from its application.
+    """
+    return release_uploads(session, [entry])
+
+
+def release_uploads(session, entries):
+    """release_upload for many entries with two statements in total.
+
+    Used when whole applications are deleted; an entry listed n times
+    drops n references. Returns the entries whose files are no longer
+    referenced: legacy files and blobs that lost their last reference.
+    """
+    counts = {}
+    released = []
+    for entry in entries:
+        parsed = parse_entry(entry)
+        if parsed is None:
+            released.append(entry)
+        elif parsed[0] in counts:
+            counts[parsed[0]][1] += 1
+        else:
+            counts[parsed[0]] = [entry, 1]
+    if not counts:
+        return released
+    rows = session.execute(text(
+        "UPDATE upload_blobs SET ref_count = ref_count - d.n "
+        "FROM unnest(:hashes, :counts) AS d(hash, n) "
+        "WHERE upload_blobs.hash = d.hash RETURNING upload_blobs.hash, upload_blobs.ref_count"
+    ), {'hashes': list(counts), 'counts': [n for _, n in counts.values()]}).all()
+    gone = [digest for digest, remaining in rows if remaining <= 0]
+    if gone:
+        session.execute(text("DELETE FROM upload_blobs WHERE hash = ANY(:hashes)"), {'hashes': gone})
+    return released + [counts[digest][0] for digest in gone]
+
+
+def remove_uploads(session, entries, root_path):
+    """Delete the files behind entries returned by release_upload(s).
+
+    Call after the releasing transaction committed. Runs its own short
+    transaction on session to skip blobs referenced again meanwhile.
+    """
+    digests = set()
+    for entry in entries:
+        parsed = parse_entry(entry)
+        if parsed is None:
+            _remove(os.path.join(uploads_folder(root_path), entry))
+        else:
+            digests.add(parsed[0])
+    if not digests:
+        return
+    try:
+        keys = sorted(_blob_lock(digest) for digest in digests)
+        session.execute(text(
+            "SELECT pg_advisory_xact_lock(k) FROM (SELECT unnest(:keys) AS k ORDER BY 1) AS l"
+        ), {'keys': keys})
+        digests -= set(session.execute(text(
+            "SELECT hash FROM upload_blobs WHERE hash = ANY(:hashes)"
+        ), {'hashes': list(digests)}).scalars())
+        for digest in digests:
+            _remove(blob_path(root_path, digest))
+    finally:
+        session.commit()
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from models import Student, Application
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def add_applications(session, count, owners):
+    start = datetime(2026, 6, 1)
+    session.add_all([Student(id=f'more{i}', first_name='More', last_name='Rows',
+                             passport_number=f'M{i:06d}', father_name='F', mother_name='M',
+                             gender='Female', phone='1', email=f'm{i}@test.local',
+                             nationality='TR', degree_target='MSc', dob='2001-01-01',
+                             residence_country='TR', user_id=owners[i % len(owners)])
+                     for i in range(count)])
+    session.flush()
+    session.add_all([Application(id=f'MORE{i:06d}', student_id=f'more{i}', program_id='prog',
+                                 status='ACCEPTED', semester='Spring', user_id=owners[i % len(owners)],
+                                 created_at=start + timedelta(minutes=i),
+                                 files=[f"{'1' * 64}_a.pdf", f"{'2' * 64}_b.pdf"])
+                     for i in range(count)])
+    session.commit()
+
+
+@pytest.mark.parametrize('path', [
+    '/api/applications',
+    '/api/applications?limit=50',
+    '/api/applications?fields=id,status,agentName',
+    '/api/bootstrap',
+])
+def test_listing_statement_count_does_not_grow_with_rows(session, client, add_catalog, auth_headers, path):
+    catalog = add_catalog(1, agents=3)
+    headers = auth_headers(catalog['admin'])
+    client.get(path, headers=headers)  # warm caches (principal, plans)
+
+    with count_statements(db.engine) as one_row:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200
+
+    add_applications(session, 30, [agent.id for agent in catalog['agents']])
+    with count_statements(db.engine) as many_rows:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    items = body['applications'] if path == '/api/bootstrap' else body
+    items = items['items'] if isinstance(items, dict) else items
+    assert len(items) == 31
+
+    assert len(many_rows) == len(one_row), many_rows
+
+
+def test_bootstrap_lists_users_only_for_admin_tokens(app, client, add_catalog, auth_headers, monkeypatch):
+    catalog = add_catalog(1)
+    body = client.get('/api/bootstrap', headers=auth_headers(catalog['admin'])).get_json()
+    assert {u['id'] for u in body['users']} == {'admin', 'agent0'}
+    body = client.get('/api/bootstrap', headers=auth_headers(catalog['agents'][0])).get_json()
+    assert 'users' not in body
+
+    # Legacy request parameters are never enough for the user list
+    monkeypatch.setitem(app.config, 'AUTH_REQUIRED', False)
+    response = client.get('/api/bootstrap?role=ADMIN&user_id=admin')
+    assert response.status_code == 200
+    assert 'users' not in response.get_json()
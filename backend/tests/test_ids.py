@@ -0,0 +1,47 @@
+import threading
+
+from sqlalchemy import text
+
+from app import db
+from ids import BlockAllocator
+
+THREADS = 8
+IDS_PER_THREAD = 200
+
+
+def test_concurrent_allocators_never_repeat_an_id(session):
+    # Small blocks so the threads keep racing for new ones; two allocators
+    # sharing the sequence stand in for two worker processes
+    sequence = 'test_application_id_seq'
+    engine = db.engine  # the threads have no app context
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SEQUENCE IF EXISTS {sequence}"))
+    allocators = [BlockAllocator(sequence=sequence, block_size=3) for _ in range(2)]
+    results = [[] for _ in range(THREADS)]
+    errors = []
+    barrier = threading.Barrier(THREADS)
+
+    def allocate(index):
+        allocator = allocators[index % len(allocators)]
+        try:
+            barrier.wait()
+            for _ in range(IDS_PER_THREAD):
+                results[index].append(allocator.next_id(engine))
+        except Exception as e:  # surfaced below; a thread cannot fail the test
+            errors.append(e)
+
+    threads = [threading.Thread(target=allocate, args=(i,)) for i in range(THREADS)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SEQUENCE IF EXISTS {sequence}"))
+
+    assert not errors
+    ids = [app_id for chunk in results for app_id in chunk]
+    assert len(ids) == THREADS * IDS_PER_THREAD
+    assert len(set(ids)) == len(ids)
+    assert all(app_id.startswith('APP') for app_id in ids)
@@ -0,0 +1,83 @@
+"""The hot queries of the API must be served by the indexes made for them.
+
+Each case runs a real request, captures the SQL it sent and EXPLAINs that
+statement with the same parameters. The test tables are small enough that
+the planner would rather scan them, so sequential scans are disabled for
+the EXPLAIN: the question is whether the expected index can serve the
+query (filter and order) better than any other index.
+"""
+import json
+
+import pytest
+from sqlalchemy import event, text
+
+from app import db
+from events import notification_hub
+
+
+def captured_statements(client, path, headers):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(path, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, response.get_json()
+    return statements
+
+
+def plan_indexes(statement, parameters):
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET enable_seqscan = off")
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0]
+        connection.rollback()
+    finally:
+        connection.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    names = set()
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if 'Index Name' in node:
+            names.add(node['Index Name'])
+        nodes.extend(node.get('Plans', []))
+    return names
+
+
+@pytest.fixture
+def catalog(session, add_catalog):
+    data = add_catalog(2000, agents=20, messages=4000, notifications=10000)
+    with db.engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    return data
+
+
+# (path, caller, marker of the statement to explain, expected index)
+CASES = [
+    ('/api/applications?limit=20', 'admin', 'FROM applications', 'ix_applications_created_at_id'),
+    ('/api/applications?limit=20', 'agent', 'FROM applications', 'ix_applications_user_id_created_at'),
+    ('/api/applications/APP000021/messages?limit=20', 'admin', 'FROM application_messages',
+     'ix_application_messages_application_id_created_at'),
+    ('/api/notifications', 'agent', 'FROM notifications', 'ix_notifications_user_id_created_at'),
+    ('/api/notifications/unread-count', 'agent', 'FROM notifications', 'ix_notifications_user_id_unread'),
+    ('/api/students?nationality=SY', 'admin', 'FROM students', 'ix_students_nationality'),
+    ('/api/students?limit=20', 'agent', 'FROM students', 'ix_students_user_id'),
+]
+
+
+@pytest.mark.parametrize('path, caller, marker, index', CASES)
+def test_query_uses_its_index(client, catalog, auth_headers, path, caller, marker, index):
+    user = catalog['admin'] if caller == 'admin' else catalog['agents'][1]
+    # The unread counter is cached per user; make the request hit the database
+    notification_hub.publish_local([user.id])
+    statements = [(s, p) for s, p in captured_statements(client, path, auth_headers(user)) if marker in s]
+    assert statements, f'no statement with {marker!r} for {path}'
+    assert index in plan_indexes(*statements[0])
@@ -0,0 +1,39 @@
+import pytest
+
+from models import Notification
+
+
+@pytest.fixture
+def agent(add_catalog):
+    # 20 notifications for agent0, two of them (n0, n10) unread
+    return add_catalog(1, notifications=20)['agents'][0]
+
+
+def unread_ids(session, user_id):
+    session.expire_all()
+    return {n.id for n in Notification.query.filter_by(user_id=user_id, is_read=False)}
+
+
+def test_mark_read_by_ids(client, session, auth_headers, agent):
+    before = unread_ids(session, agent.id)
+    chosen = sorted(before)[:2]
+    response = client.put('/api/notifications/read', json={'ids': chosen + ['missing']},
+                          headers=auth_headers(agent))
+    assert response.status_code == 200
+    assert response.get_json()['updated'] == 2
+    assert unread_ids(session, agent.id) == before - set(chosen)
+
+
+def test_mark_all_read(client, session, auth_headers, agent):
+    response = client.put('/api/notifications/read', json={}, headers=auth_headers(agent))
+    assert response.status_code == 200
+    assert response.get_json()['updated'] == 2
+    assert unread_ids(session, agent.id) == set()
+
+
+@pytest.mark.parametrize('ids', [[1, 2], 'n0', {'id': 'n0'}, ['n0', None]])
+def test_mark_read_rejects_bad_ids(client, session, auth_headers, agent, ids):
+    before = unread_ids(session, agent.id)
+    response = client.put('/api/notifications/read', json={'ids': ids}, headers=auth_headers(agent))
+    assert response.status_code == 400
+    assert unread_ids(session, agent.id) == before
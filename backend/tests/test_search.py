@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import text
+
+from app import db
+from models import Student, SEARCH_FOLD_TO
+
+
+@pytest.fixture
+def students(session, add_catalog):
+    catalog = add_catalog(0)
+    session.add_all([
+        Student(id='fatima', first_name='فاطمة', last_name='أحمد', passport_number='F1',
+                father_name='F', mother_name='M', gender='Female', phone='1',
+                email='f@test.local', nationality='SY', degree_target='BSc', dob='2000-01-01',
+                residence_country='TR'),
+        Student(id='hamza', first_name='حمزه', last_name='علي', passport_number='H1',
+                father_name='F', mother_name='M', gender='Male', phone='2',
+                email='h@test.local', nationality='SY', degree_target='BSc', dob='2000-01-01',
+                residence_country='TR'),
+    ])
+    session.commit()
+    return catalog
+
+
+@pytest.mark.parametrize('q, student_id', [
+    ('فاطمه', 'fatima'),
+    ('فاطمة', 'fatima'),
+    ('حمزة', 'hamza'),
+    ('احمد', 'fatima'),
+])
+def test_search_folds_arabic_letter_variants(client, auth_headers, students, q, student_id):
+    response = client.get('/api/search', query_string={'q': q}, headers=auth_headers(students['admin']))
+    assert response.status_code == 200
+    assert [s['id'] for s in response.get_json()['students']] == [student_id]
+
+
+def test_search_indexes_use_the_current_fold(app):
+    with db.engine.connect() as conn:
+        definitions = conn.execute(text(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE indexname LIKE 'ix_%_search'"
+        )).all()
+    assert {name for name, _ in definitions} == {
+        'ix_students_search', 'ix_programs_search', 'ix_universities_search'}
+    assert all(SEARCH_FOLD_TO in definition for _, definition in definitions)
@@ -0,0 +1,54 @@
+import io
+import os
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import routes
+from models import University
+
+
+def post_sheet(client, headers, content, filename):
+    return client.post('/api/universities/import', headers=headers, content_type='multipart/form-data',
+                       data={'file': (io.BytesIO(content), filename)})
+
+
+def upload_files(app):
+    folder = os.path.join(app.root_path, 'uploads')
+    return set(os.listdir(folder)) if os.path.isdir(folder) else set()
+
+
+def test_csv_import_strips_headers_and_keeps_no_copy(app, client, session, add_catalog, auth_headers):
+    headers = auth_headers(add_catalog(0)['admin'])
+    before = upload_files(app)
+    content = ' name , city ,Website\nIstanbul Tech,Istanbul,https://itu.test\n,,\n'.encode()
+    response = post_sheet(client, headers, content, 'universities.csv')
+    assert response.status_code == 201, response.get_json()
+    assert [u['name'] for u in response.get_json()['added']] == ['Istanbul Tech']
+    assert session.query(University.city).filter_by(name='Istanbul Tech').scalar() == 'Istanbul'
+    assert upload_files(app) == before
+
+
+def test_unreadable_sheet_is_a_bad_request(client, add_catalog, auth_headers):
+    headers = auth_headers(add_catalog(0)['admin'])
+    response = post_sheet(client, headers, b'not a workbook', 'universities.xlsx')
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith('Failed to read file')
+
+
+def test_database_errors_are_not_reported_as_read_errors(client, session, add_catalog, auth_headers,
+                                                         monkeypatch, tmp_path):
+    headers = auth_headers(add_catalog(0)['admin'])
+
+    def broken_flush(*args):
+        raise OperationalError('INSERT', {}, Exception('connection lost'))
+
+    monkeypatch.setattr(routes, '_flush_university_chunk', broken_flush)
+    sheet = tmp_path / 'universities.csv'
+    sheet.write_text('name\nUni A\n', encoding='utf-8')
+    # The job handler sees the real error and retries instead of failing for good
+    with pytest.raises(OperationalError):
+        routes._import_universities_file(str(sheet))
+    response = post_sheet(client, headers, b'name\nUni A\n', 'universities.csv')
+    assert response.status_code == 500
+
@@ -0,0 +1,9 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+run.py stays the development server (single process, debug reloader).
+"""
+from app import create_app
+
+app = create_app()
@@ -7,6 +7,8 @@ import {
 } from 'lucide-react';
 import { useTranslation } from '../hooks/useTranslation';
 
+const MESSAGE_PAGE_SIZE = 50;
+
 interface ApplicationManagerProps {
   applications: Application[];
   students: Student[];
@@ -30,6 +32,8 @@ export const ApplicationManager: React.FC<ApplicationManagerProps> = ({
   const [selectedAppId, setSelectedAppId] = useState<string | null>(null);
   const [messages, setMessages] = React.useState<Array<{ id: string; sender: string; message: string; createdAt: string }>>([]);
   const [newMessage, setNewMessage] = React.useState('');
+  // Cursor of the next older page of the open thread (null when fully loaded)
+  const [olderCursor, setOlderCursor] = React.useState<string | null>(null);
   const [detailFiles, setDetailFiles] = React.useState<Array<{ url: string; name: string; filename?: string }>>([]);
   const [attachFiles, setAttachFiles] = React.useState<FileList | null>(null);
 
@@ -122,9 +126,13 @@ export const ApplicationManager: React.FC<ApplicationManagerProps> = ({
     const loadMessages = async (appId?: string | null) => {
       if (!appId) return;
       try {
-        const res = await fetch(`/api/applications/${appId}/messages`);
+        // Only the latest page; older history is loaded on demand
+        const res = await fetch(`/api/applications/${appId}/messages?limit=${MESSAGE_PAGE_SIZE}`);
         const data = await res.json();
-        if (res.ok) setMessages(data);
+        if (res.ok) {
+          setMessages(data.items);
+          setOlderCursor(data.nextCursor);
+        }
       } catch (err) {
         console.error('Failed to load messages', err);
       }
@@ -263,6 +271,20 @@ export const ApplicationManager: React.FC<ApplicationManagerProps> = ({
     const program = getProgram(app.programId);
     const university = program ? getUni(program.universityId) : null;
 
+    const loadOlderMessages = async () => {
+      if (!olderCursor || !selectedAppId) return;
+      try {
+        const res = await fetch(`/api/applications/${selectedAppId}/messages?limit=${MESSAGE_PAGE_SIZE}&before=${encodeURIComponent(olderCursor)}`);
+        const data = await res.json();
+        if (res.ok) {
+          setMessages(prev => [...data.items, ...prev]);
+          setOlderCursor(data.nextCursor);
+        }
+      } catch (err) {
+        console.error('Failed to load messages', err);
+      }
+    };
+
     const sendMessage = async () => {
       if (!newMessage.trim() || !selectedAppId) return;
       try {
@@ -274,7 +296,7 @@ export const ApplicationManager: React.FC<ApplicationManagerProps> = ({
         });
         const data = await res.json();
         if (res.ok) {
-          setMessages(prev => [...prev, { id: data.id, sender: senderRole, message: newMessage.trim(), createdAt: new Date().toISOString() }]);
+          setMessages(prev => [...prev, data.item]);
           setNewMessage('');
         } else { alert(data.message || 'فشل إرسال الرسالة'); }
       } catch { alert('خطأ في الاتصال'); }
@@ -429,6 +451,13 @@ export const ApplicationManager: React.FC<ApplicationManagerProps> = ({
 
             {/* Messages Area */}
             <div className="flex-1 overflow-y-auto p-6 space-y-4 bg-gray-50/30">
+              {olderCursor && (
+                <div className="flex justify-center">
+                  <button onClick={loadOlderMessages} className="text-xs text-blue-600 hover:text-blue-800">
+                    {t.loadOlderMessages}
+                  </button>
+                </div>
+              )}
               {messages.length === 0 ? (
                 <div className="h-full flex flex-col items-center justify-center text-gray-300 space-y-2">
                   <MessageSquare size={48} className="opacity-10" />
@@ -594,6 +623,14 @@ export const ApplicationManager: React.FC<ApplicationManagerProps> = ({
     );
   };
 
+  // Exports stream from the server; role/user_id scope them when no session cookie is set
+  const exportUrl = (format: 'csv' | 'xlsx') => {
+    const params = new URLSearchParams({ format });
+    if (currentUser?.role) params.set('role', currentUser.role);
+    if (currentUser?.id) params.set('user_id', currentUser.id);
+    return `/api/applications/export?${params}`;
+  };
+
   return (
     <div className="space-y-6">
       {view === 'list' && (
@@ -603,13 +640,23 @@ export const ApplicationManager: React.FC<ApplicationManagerProps> = ({
               <h2 className="text-3xl font-extrabold text-gray-900 tracking-tight">{t.applicationsTitle}</h2>
               <p className="text-gray-400 font-medium">مراقبة وإدارة ملفات القبول الجامعي</p>
             </div>
-            <button
-              onClick={() => setView('create')}
-              className="flex items-center gap-2 bg-blue-600 text-white px-6 py-3 rounded-2xl hover:bg-blue-700 transition-all shadow-xl shadow-blue-100 font-bold active:scale-95"
-            >
-              <Plus size={22} strokeWidth={3} />
-              <span>{t.addApplication}</span>
-            </button>
+            <div className="flex items-center gap-2">
+              <a href={exportUrl('xlsx')}
+                className="flex items-center bg-gray-100 text-gray-700 px-4 py-3 rounded-2xl hover:bg-gray-200 transition-all font-bold">
+                {t.export} Excel
+              </a>
+              <a href={exportUrl('csv')}
+                className="flex items-center bg-gray-100 text-gray-700 px-4 py-3 rounded-2xl hover:bg-gray-200 transition-all font-bold">
+                {t.export} CSV
+              </a>
+              <button
+                onClick={() => setView('create')}
+                className="flex items-center gap-2 bg-blue-600 text-white px-6 py-3 rounded-2xl hover:bg-blue-700 transition-all shadow-xl shadow-blue-100 font-bold active:scale-95"
+              >
+                <Plus size={22} strokeWidth={3} />
+                <span>{t.addApplication}</span>
+              </button>
+            </div>
           </div>
 
           <div className="bg-white rounded-3xl shadow-sm border border-gray-100 overflow-hidden mt-6 overflow-x-auto">
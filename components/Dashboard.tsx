@@ -1,5 +1,5 @@
-import React from 'react';
-import { Student, Application, Program } from '../types';
+import React, { useEffect, useState } from 'react';
+import { Student, Application, Program, User, UserRole } from '../types';
 import { Users, FileText, School, TrendingUp } from 'lucide-react';
 import { useTranslation } from '../hooks/useTranslation';
 
@@ -8,15 +8,45 @@ interface DashboardProps {
   applications: Application[];
   programs: Program[];
   universitiesCount: number;
+  currentUser?: User | null;
+}
+
+interface RecentApplication {
+  id: string;
+  studentId: string;
+  studentName: string | null;
+  programId: string;
+  programName: string | null;
+  status: string;
+}
+
+interface DashboardStats {
+  totals: { students: number; applications: number; universities: number; programs: number };
+  recentApplications: RecentApplication[];
 }
 
 export const Dashboard: React.FC<DashboardProps> = ({
   students,
   applications,
   programs,
-  universitiesCount
+  universitiesCount,
+  currentUser
 }) => {
   const { t, translateStatus } = useTranslation();
+  const [serverStats, setServerStats] = useState<DashboardStats | null>(null);
+
+  // Totals and recent applications are aggregated by the server (/api/stats)
+  useEffect(() => {
+    if (!currentUser) return;
+    let url = '/api/stats?limit=5';
+    if (currentUser.role === UserRole.AGENT) {
+      url += `&role=agent&user_id=${currentUser.id}`;
+    }
+    fetch(url)
+      .then(r => (r.ok ? r.json() : null))
+      .then(data => setServerStats(data))
+      .catch(() => setServerStats(null));
+  }, [currentUser, applications.length, students.length]);
 
   // Helper to get program name
   const getProgramName = (progId: string) => programs.find(p => p.id === progId)?.name || t.noPrograms;
@@ -25,13 +55,25 @@ export const Dashboard: React.FC<DashboardProps> = ({
     return s ? `${s.firstName} ${s.lastName}` : t.noStudents;
   };
 
+  const totals = serverStats?.totals;
   const stats = [
-    { label: t.totalStudents, value: students.length, icon: Users, color: 'bg-blue-500' },
-    { label: t.totalApplications, value: applications.length, icon: FileText, color: 'bg-emerald-500' },
-    { label: t.totalUniversities, value: universitiesCount, icon: School, color: 'bg-purple-500' },
-    { label: t.totalPrograms, value: programs.length, icon: TrendingUp, color: 'bg-orange-500' },
+    { label: t.totalStudents, value: totals ? totals.students : students.length, icon: Users, color: 'bg-blue-500' },
+    { label: t.totalApplications, value: totals ? totals.applications : applications.length, icon: FileText, color: 'bg-emerald-500' },
+    { label: t.totalUniversities, value: totals ? totals.universities : universitiesCount, icon: School, color: 'bg-purple-500' },
+    { label: t.totalPrograms, value: totals ? totals.programs : programs.length, icon: TrendingUp, color: 'bg-orange-500' },
   ];
 
+  const recentApplications: RecentApplication[] = serverStats
+    ? serverStats.recentApplications
+    : applications.slice(-5).reverse().map(app => ({
+      id: app.id,
+      studentId: app.studentId,
+      studentName: getStudentName(app.studentId),
+      programId: app.programId,
+      programName: getProgramName(app.programId),
+      status: app.status
+    }));
+
   return (
     <div className="space-y-8">
       <div>
@@ -71,11 +113,11 @@ export const Dashboard: React.FC<DashboardProps> = ({
                 </tr>
               </thead>
               <tbody className="divide-y divide-gray-100">
-                {applications.slice(-5).reverse().map((app) => (
+                {recentApplications.map((app) => (
                   <tr key={app.id} className="hover:bg-gray-50">
                     <td className="px-6 py-4 font-mono text-xs">{app.id.substring(0, 8)}...</td>
-                    <td className="px-6 py-4">{getStudentName(app.studentId)}</td>
-                    <td className="px-6 py-4 text-gray-600">{getProgramName(app.programId)}</td>
+                    <td className="px-6 py-4">{app.studentName || t.noStudents}</td>
+                    <td className="px-6 py-4 text-gray-600">{app.programName || t.noPrograms}</td>
                     <td className="px-6 py-4">
                       <span className={`px-2 py-1 rounded-full text-xs font-medium 
                         ${app.status === 'Accepted' || app.status === 'APPROVED' ? 'bg-green-100 text-green-700' :
@@ -86,7 +128,7 @@ export const Dashboard: React.FC<DashboardProps> = ({
                     </td>
                   </tr>
                 ))}
-                {applications.length === 0 && (
+                {recentApplications.length === 0 && (
                   <tr>
                     <td colSpan={4} className="px-6 py-8 text-center text-gray-400">{t.noApplications}</td>
                   </tr>
@@ -23,27 +23,52 @@ export const NotificationDropdown: React.FC<NotificationDropdownProps> = ({ curr
     const [isOpen, setIsOpen] = useState(false);
     const [loading, setLoading] = useState(false);
 
-    const fetchNotifications = async () => {
-        if (!currentUserId) return;
+    const fetchNotifications = async (): Promise<Notification[]> => {
+        if (!currentUserId) return [];
         setLoading(true);
         try {
             const res = await fetch(`/api/notifications?user_id=${currentUserId}`);
             if (res.ok) {
                 const data = await res.json();
                 setNotifications(data);
+                return data;
             }
         } catch (err) {
             console.error('Failed to fetch notifications', err);
         } finally {
             setLoading(false);
         }
+        return [];
     };
 
     useEffect(() => {
-        fetchNotifications();
-        // Poll every 60 seconds
-        const interval = setInterval(fetchNotifications, 60000);
-        return () => clearInterval(interval);
+        if (!currentUserId) return;
+        let source: EventSource | null = null;
+        let cancelled = false;
+
+        // Load the history once, then let the server push only new notifications
+        const start = async () => {
+            const initial = await fetchNotifications();
+            if (cancelled || typeof EventSource === 'undefined') return;
+            const since = initial.length ? initial[0].createdAt : '';
+            source = new EventSource(`/api/notifications/stream?user_id=${currentUserId}&since=${encodeURIComponent(since)}`);
+            source.addEventListener('notifications', (event) => {
+                const data = JSON.parse((event as MessageEvent).data);
+                if (data.notifications && data.notifications.length) {
+                    setNotifications(current => {
+                        const known = new Set(current.map(n => n.id));
+                        const fresh = data.notifications.filter((n: Notification) => !known.has(n.id));
+                        return [...fresh, ...current];
+                    });
+                }
+            });
+        };
+        start();
+
+        return () => {
+            cancelled = true;
+            if (source) source.close();
+        };
     }, [currentUserId]);
 
     const markAsRead = async (notificationId: string) => {
@@ -61,6 +86,21 @@ export const NotificationDropdown: React.FC<NotificationDropdownProps> = ({ curr
         }
     };
 
+    const markAllAsRead = async () => {
+        try {
+            const res = await fetch('/api/notifications/read', {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ user_id: currentUserId })
+            });
+            if (res.ok) {
+                setNotifications(prev => prev.map(n => n.isRead ? n : { ...n, isRead: true }));
+            }
+        } catch (err) {
+            console.error('Failed to mark all as read', err);
+        }
+    };
+
     const handleNotificationClick = (notification: Notification) => {
         markAsRead(notification.id);
         setIsOpen(false);
@@ -101,7 +141,15 @@ export const NotificationDropdown: React.FC<NotificationDropdownProps> = ({ curr
                         <div className="p-4 border-b border-gray-200 flex justify-between items-center">
                             <h3 className="font-bold text-gray-800">{t.notificationsTitle}</h3>
                             {unreadCount > 0 && (
-                                <span className="text-sm text-gray-500">{unreadCount} {t.newMessage}</span>
+                                <div className="flex items-center gap-3">
+                                    <span className="text-sm text-gray-500">{unreadCount} {t.newMessage}</span>
+                                    <button
+                                        onClick={markAllAsRead}
+                                        className="text-sm text-blue-600 hover:text-blue-800"
+                                    >
+                                        {t.markAllAsRead}
+                                    </button>
+                                </div>
                             )}
                         </div>
 
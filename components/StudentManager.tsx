@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useRef } from 'react';
 import { Student, Application, Program, University, ApplicationStatus } from '../types';
 import { Plus, User, Search, Eye, X } from 'lucide-react';
 import { useTranslation } from '../hooks/useTranslation';
@@ -9,6 +9,7 @@ interface StudentManagerProps {
   programs: Program[];
   universities: University[];
   onAddStudent: (student: Student) => Promise<string | null> | string | null;
+  onImportStudents?: (file: File) => Promise<{ ok: boolean; message?: string; imported?: number; rejected?: { row: number; passportNumber: string; reason: string }[] }>;
   onCreateApplicationForStudent?: (studentId: string) => void;
   onViewApplication?: (applicationId: string) => void;
   currentUser: { id: string; role: string } | null;
@@ -20,6 +21,7 @@ export const StudentManager: React.FC<StudentManagerProps> = ({
   programs = [],
   universities = [],
   onAddStudent,
+  onImportStudents,
   onCreateApplicationForStudent,
   onViewApplication,
   currentUser
@@ -84,6 +86,35 @@ export const StudentManager: React.FC<StudentManagerProps> = ({
     }
   };
 
+  /* -------- Excel/CSV Import -------- */
+  const fileInputRef = useRef<HTMLInputElement | null>(null);
+  const [uploading, setUploading] = useState(false);
+  const handleFileChange = async (e: React.ChangeEvent<HTMLInputElement>) => {
+    const file = e.target.files?.[0];
+    if (!file || !onImportStudents) return;
+    setUploading(true);
+    try {
+      const data = await onImportStudents(file);
+      if (data.ok) {
+        const rejected = data.rejected || [];
+        const details = rejected.slice(0, 20).map(r => `#${r.row} ${r.passportNumber}: ${r.reason}`).join('\n');
+        alert(`${t.successAdd}: ${data.imported} ${t.students}` +
+          (rejected.length ? `\n${t.rejectedRows}: ${rejected.length}\n${details}` : ''));
+      } else { alert(data.message || t.errorAdd); }
+    } catch { alert(t.errorConnection); }
+    finally {
+      setUploading(false);
+      if (fileInputRef.current) fileInputRef.current.value = '';
+    }
+  };
+
+  // Exports stream from the server; role/user_id scope them when no session cookie is set
+  const exportUrl = (format: 'csv' | 'xlsx') => {
+    const params = new URLSearchParams({ format });
+    if (currentUser) { params.set('role', currentUser.role); params.set('user_id', currentUser.id); }
+    return `/api/students/export?${params}`;
+  };
+
   const filteredStudents = students.filter(student =>
     student.firstName.includes(searchTerm) ||
     student.lastName.includes(searchTerm) ||
@@ -122,13 +153,32 @@ export const StudentManager: React.FC<StudentManagerProps> = ({
           <h2 className="text-2xl font-bold text-gray-800">{t.studentsTitle}</h2>
           <p className="text-gray-500">{t.studentsTitle}</p>
         </div>
-        <button
-          onClick={() => setModalOpen(true)}
-          className="flex items-center space-x-2 space-x-reverse bg-blue-600 text-white px-4 py-2 rounded-lg hover:bg-blue-700 transition-colors"
-        >
-          <Plus size={20} />
-          <span>{t.addStudent}</span>
-        </button>
+        <div className="flex items-center gap-2">
+          <a href={exportUrl('xlsx')}
+            className="flex items-center bg-gray-100 text-gray-700 px-3 py-2 rounded-lg hover:bg-gray-200 transition-colors">
+            {t.export} Excel
+          </a>
+          <a href={exportUrl('csv')}
+            className="flex items-center bg-gray-100 text-gray-700 px-3 py-2 rounded-lg hover:bg-gray-200 transition-colors">
+            {t.export} CSV
+          </a>
+          {onImportStudents && (
+            <>
+              <input ref={fileInputRef} type="file" accept=".xlsx,.csv" onChange={handleFileChange} style={{ display: 'none' }} />
+              <button onClick={() => fileInputRef.current?.click()} disabled={uploading}
+                className="flex items-center bg-green-600 text-white px-3 py-2 rounded-lg hover:bg-green-700 transition-colors">
+                <span>{uploading ? t.loading : t.import}</span>
+              </button>
+            </>
+          )}
+          <button
+            onClick={() => setModalOpen(true)}
+            className="flex items-center space-x-2 space-x-reverse bg-blue-600 text-white px-4 py-2 rounded-lg hover:bg-blue-700 transition-colors"
+          >
+            <Plus size={20} />
+            <span>{t.addStudent}</span>
+          </button>
+        </div>
       </div>
 
       <div className="bg-white p-4 rounded-xl shadow-sm border border-gray-100">
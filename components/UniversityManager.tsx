@@ -6,6 +6,7 @@ import {
   MapPin, ExternalLink, GraduationCap
 } from 'lucide-react';
 import { generateUniversityDescription } from '../services/geminiService';
+import { waitForJob } from '../services/jobs';
 import { useTranslation } from '../hooks/useTranslation';
 
 interface UniversityManagerProps {
@@ -128,9 +129,15 @@ export const UniversityManager: React.FC<UniversityManagerProps> = ({
     setUploading(true);
     const form = new FormData(); form.append('file', file);
     try {
-      const res = await fetch('/api/universities/import', { method: 'POST', body: form });
-      const data = await res.json();
-      if (res.ok) {
+      const res = await fetch('/api/universities/import?async=1', { method: 'POST', body: form });
+      let data = await res.json();
+      let ok = res.ok;
+      if (res.status === 202) {
+        const job = await waitForJob(data.jobId);
+        ok = job.status === 'succeeded';
+        data = ok ? job.result : { message: job.error };
+      }
+      if (ok) {
         if (data.added && Array.isArray(data.added)) {
           data.added.forEach((u: any) => onAddUniversity({
             id: u.id, name: u.name, website: u.website,
@@ -174,7 +181,7 @@ export const UniversityManager: React.FC<UniversityManagerProps> = ({
     return (
       <div className={`${cls} overflow-hidden flex items-center justify-center bg-blue-50 text-blue-600 font-bold flex-shrink-0 border border-blue-100`}>
         {uni.logo
-          ? <img src={uni.logo} alt={uni.name} className="h-full w-full object-contain p-1"
+          ? <img src={size === 'sm' ? (uni.logoThumb || uni.logo) : uni.logo} alt={uni.name} className="h-full w-full object-contain p-1"
             onError={e => { (e.target as HTMLImageElement).style.display = 'none'; (e.target as HTMLImageElement).parentElement!.innerHTML = uni.name.substring(0, 2).toUpperCase(); }} />
           : uni.name.substring(0, 2).toUpperCase()}
       </div>
@@ -14,6 +14,7 @@ export interface Translations {
     filter: string;
     export: string;
     import: string;
+    export: string;
     yes: string;
     no: string;
     confirm: string;
@@ -118,6 +119,8 @@ export interface Translations {
     sendMessage: string;
     messages: string;
     noMessages: string;
+    loadOlderMessages: string;
+    rejectedRows: string;
     typeMessage: string;
 
     // Users
@@ -141,6 +144,7 @@ export interface Translations {
     notificationsTitle: string;
     noNotifications: string;
     markAsRead: string;
+    markAllAsRead: string;
     newMessage: string;
     statusUpdate: string;
     statusUpdateMessage: string;
@@ -184,6 +188,7 @@ export const translations: Record<Language, Translations> = {
         filter: 'تصفية',
         export: 'تصدير',
         import: 'استيراد',
+        export: 'تصدير',
         yes: 'نعم',
         no: 'لا',
         confirm: 'تأكيد',
@@ -288,6 +293,8 @@ export const translations: Record<Language, Translations> = {
         sendMessage: 'إرسال رسالة',
         messages: 'الرسائل',
         noMessages: 'لا توجد رسائل',
+        loadOlderMessages: 'عرض الرسائل الأقدم',
+        rejectedRows: 'صفوف مرفوضة',
         typeMessage: 'اكتب رسالة...',
 
         // Users
@@ -311,6 +318,7 @@ export const translations: Record<Language, Translations> = {
         notificationsTitle: 'الإشعارات',
         noNotifications: 'لا توجد إشعارات',
         markAsRead: 'تعليم كمقروء',
+        markAllAsRead: 'تعليم الكل كمقروء',
         newMessage: 'رسالة جديدة',
         statusUpdate: 'تحديث الحالة',
         statusUpdateMessage: 'تم تغيير حالة طلبك #{id} إلى {status}',
@@ -353,6 +361,7 @@ export const translations: Record<Language, Translations> = {
         filter: 'Filter',
         export: 'Export',
         import: 'Import',
+        export: 'Export',
         yes: 'Yes',
         no: 'No',
         confirm: 'Confirm',
@@ -457,6 +466,8 @@ export const translations: Record<Language, Translations> = {
         sendMessage: 'Send Message',
         messages: 'Messages',
         noMessages: 'No messages',
+        loadOlderMessages: 'Load older messages',
+        rejectedRows: 'Rejected rows',
         typeMessage: 'Type a message...',
 
         // Users
@@ -480,6 +491,7 @@ export const translations: Record<Language, Translations> = {
         notificationsTitle: 'Notifications',
         noNotifications: 'No notifications',
         markAsRead: 'Mark as Read',
+        markAllAsRead: 'Mark all as read',
         newMessage: 'New Message',
         statusUpdate: 'Status Update',
         statusUpdateMessage: 'Your application #{id} status changed to {status}',
@@ -522,6 +534,7 @@ export const translations: Record<Language, Translations> = {
         filter: 'Filtrele',
         export: 'Dışa Aktar',
         import: 'İçe Aktar',
+        export: 'Dışa Aktar',
         yes: 'Evet',
         no: 'Hayır',
         confirm: 'Onayla',
@@ -626,6 +639,8 @@ export const translations: Record<Language, Translations> = {
         sendMessage: 'Mesaj Gönder',
         messages: 'Mesajlar',
         noMessages: 'Mesaj yok',
+        loadOlderMessages: 'Eski mesajları yükle',
+        rejectedRows: 'Reddedilen satırlar',
         typeMessage: 'Mesaj yazın...',
 
         // Users
@@ -649,6 +664,7 @@ export const translations: Record<Language, Translations> = {
         notificationsTitle: 'Bildirimler',
         noNotifications: 'Bildirim yok',
         markAsRead: 'Okundu Olarak İşaretle',
+        markAllAsRead: 'Tümünü okundu işaretle',
         newMessage: 'Yeni Mesaj',
         statusUpdate: 'Durum Güncellemesi',
         statusUpdateMessage: '#{id} numaralı başvurunuzun durumu {status} olarak güncellendi',
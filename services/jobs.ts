@@ -0,0 +1,27 @@
+// Long-running API work (imports) answers 202 with a job id; poll it until it finishes.
+export interface Job {
+  id: string;
+  type: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  progress: number;
+  total: number | null;
+  attempts: number;
+  maxAttempts: number;
+  result: any;
+  error: string | null;
+}
+
+export const waitForJob = async (
+  jobId: string,
+  onProgress?: (job: Job) => void,
+  intervalMs = 1000
+): Promise<Job> => {
+  for (;;) {
+    const res = await fetch(`/api/jobs/${jobId}`);
+    if (!res.ok) throw new Error(`job ${jobId}: ${res.status}`);
+    const job: Job = await res.json();
+    if (job.status === 'succeeded' || job.status === 'failed') return job;
+    onProgress?.(job);
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+};
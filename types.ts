@@ -21,7 +21,8 @@ export interface University {
   country: 'Turkey' | 'Cyprus';
   city: string;
   description: string;
-  logo?: string; // URL or base64 - optional
+  logo?: string; // URL - optional
+  logoThumb?: string; // small variant of logo for lists
 }
 
 export interface Program {